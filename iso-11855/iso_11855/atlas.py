@@ -0,0 +1,257 @@
+"""Precomputed K_H atlas for system types A, C, H, I and J.
+
+K_H depends on the covering and the case of application only through the
+K_H2 closed form, so the atlas tabulates the two floor values (R_k_b = 0
+and R_k_b*) and B over W, s_u, k_E, pipe diameter and pipe conductivity,
+and applies K_H2 exactly at query time. Build it once with
+`python -m iso_11855.atlas`; it is stored in ATLAS_DIR (~/.cache/iso_11855/atlas,
+or $ISO_11855_ATLAS) with the checksum of the tables it was built from, and
+an atlas of other tables is not used.
+
+Type B is not tabulated: its floor values also depend on s_WL, k_WL, L_WL
+and d_M, three more axes than the grid above (a few hundred times the
+size), and a_WL switches method at K_WL = 0.5 and 1, where interpolating
+across the switch loses the accuracy. Type D is a closed form. Both are
+evaluated exactly.
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+import os
+from pathlib import Path
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+from . import functions as f
+from . import vectorized as v
+from .batch import (
+    R_K_B_STAR,
+    EmbeddedRadiantSystemBatch,
+    broadcast_columns,
+    calc_K_H,
+    calc_K_H_floor,
+    default_columns,
+)
+from .tables import data_checksum, on_reload
+
+ATLAS_DIR = Path(
+    os.environ.get("ISO_11855_ATLAS", Path.home() / ".cache" / "iso_11855" / "atlas")
+)
+ATLAS_TYPES = "ACHIJ"
+AXES = {
+    "W": (0.05, 0.075, 0.1, 0.125, 0.15, 0.175, 0.2, 0.225, 0.25, 0.3, 0.35, 0.375, 0.4, 0.45),
+    "s_u": tuple(np.round(np.arange(0.01, 0.1001, 0.01), 3)),
+    "k_E": (0.6, 0.7, 0.8, 0.9, 1.0, 1.2, 1.4, 1.6, 1.8, 2.0, 2.2, 2.4),
+    "external_diameter": (0.01, 0.012, 0.014, 0.016, 0.018, 0.02, 0.025),
+    "conductivity": (0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5),
+}
+WALL_THICKNESS = 0.002  # Pipe wall thickness the atlas is built for [m]
+DEFAULTS = default_columns()
+
+
+def _effective_k_E(k_E, psi, k_W):
+    return np.where((0.05 <= psi) & (psi <= 0.15), v.k_E_prim(psi, k_E, k_W), k_E)
+
+
+def build_atlas(path=ATLAS_DIR, axes=AXES, wall_thickness=WALL_THICKNESS, n_check=5000, seed=0):
+    """Tabulate the floor values on the `axes` grid and estimate the atlas accuracy.
+
+    Writes ACHIJ.npy (values, memory-mappable) and ACHIJ.npz (axes, table
+    checksum and accuracy) to `path` and returns the accuracy. The errors
+    are the largest of n_check random designs, an estimate: other designs
+    can be off by somewhat more.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    axes = {name: np.asarray(axis, dtype=float) for name, axis in axes.items()}
+    mesh = np.meshgrid(*axes.values(), indexing="ij")
+    columns = broadcast_columns(
+        {
+            **{name: values.ravel() for name, values in zip(axes, mesh)},
+            "system_type": "A",
+            "wall_thickness": wall_thickness,
+            "d_M": 0.0,
+            "psi": 0.0,
+        }
+    )
+    K_H_Floor, B = calc_K_H_floor(columns, R_k_b=np.array([[0.0], [R_K_B_STAR]]))
+    values = np.stack([*K_H_Floor, B[1]], axis=-1).reshape(*mesh[0].shape, 3)
+
+    # accuracy on random designs inside the grid, against the exact batch path
+    rng = np.random.default_rng(seed)
+    sample = {name: rng.uniform(axis[0], axis[-1], n_check) for name, axis in axes.items()}
+    sample.update(
+        system_type="A",
+        wall_thickness=wall_thickness,
+        d_M=0.0,
+        psi=0.0,
+        R_k_B=rng.uniform(0, 0.15, n_check),
+        case_of_application=rng.choice(list(f.ALFA_SWITCHER), n_check),
+    )
+    exact = EmbeddedRadiantSystemBatch.from_columns(sample)
+    floor = Atlas(values, axes, wall_thickness).floor_values(sample)
+    K_H = calc_K_H(*floor[:2], exact.R_k_B, exact.alfa, exact.floor_alfa)
+    error = np.abs(K_H - exact.K_H)
+    accuracy = {
+        "samples": n_check,
+        "max_abs_error": float(error.max()),
+        "max_rel_error": float((error / np.abs(exact.K_H)).max()),
+    }
+    np.save(path / "ACHIJ.npy", values)
+    np.savez(
+        path / "ACHIJ.npz",
+        wall_thickness=wall_thickness,
+        checksum=data_checksum(),
+        names=list(axes),
+        **{f"axis_{name}": axis for name, axis in axes.items()},
+        **accuracy,
+    )
+    _load_atlas.cache_clear()
+    return accuracy
+
+
+class Atlas:
+    """Floor values tabulated over `axes`, see build_atlas() and load_atlas()."""
+
+    def __init__(self, values, axes, wall_thickness, checksum=None, accuracy=None):
+        self.values = values
+        self.axes = axes
+        self.wall_thickness = wall_thickness
+        self.checksum = checksum  # data_checksum() of the tables it was built from
+        self.accuracy = accuracy  # Largest errors of a random sample, see build_atlas()
+        self.interpolator = RegularGridInterpolator(tuple(axes.values()), values)
+        self._axes = [axis.tolist() for axis in axes.values()]
+        self._values = values.view(np.ndarray)  # plain slices of a memory map
+
+    @classmethod
+    def load(cls, path=ATLAS_DIR):
+        path = Path(path)
+        values = np.load(path / "ACHIJ.npy", mmap_mode="r")
+        with np.load(path / "ACHIJ.npz") as meta:
+            return cls(
+                values,
+                {name: meta[f"axis_{name}"] for name in meta["names"]},
+                float(meta["wall_thickness"]),
+                str(meta["checksum"]) if "checksum" in meta else None,
+                {
+                    "samples": int(meta["samples"]) if "samples" in meta else None,
+                    "max_abs_error": float(meta["max_abs_error"]),
+                    "max_rel_error": float(meta["max_rel_error"]),
+                },
+            )
+
+    def covers(self, columns):
+        """Rows inside the atlas: types A, C, H, I, J within the grid and its fixed inputs."""
+        inside = np.isin(columns["system_type"], list(ATLAS_TYPES))
+        inside &= columns["wall_thickness"] == self.wall_thickness
+        inside &= columns["d_M"] <= columns["external_diameter"]
+        for name, axis in self.axes.items():
+            inside &= (axis[0] <= columns[name]) & (columns[name] <= axis[-1])
+        return inside
+
+    def floor_values(self, columns):
+        """K_H_Floor, K_H_Floor_star and B of designs given as columns inside the grid."""
+        points = np.stack([np.asarray(columns[name], dtype=float) for name in self.axes], axis=-1)
+        return np.moveaxis(self.interpolator(points), -1, 0)
+
+    def point(self, *inputs):
+        """Floor values of one design, inputs in axis order; None if off the grid.
+
+        Multilinear interpolation on the 2**5 corner block around the point,
+        without the per-call set-up of the array path.
+        """
+        index, weights = [], [1.0]
+        for x, axis in zip(inputs, self._axes):
+            if not axis[0] <= x <= axis[-1]:
+                return None
+            i = min(bisect_right(axis, x), len(axis) - 1) - 1
+            t = (x - axis[i]) / (axis[i + 1] - axis[i])
+            index.append(slice(i, i + 2))
+            weights = [w * u for w in weights for u in (1 - t, t)]
+        return np.dot(weights, self._values[tuple(index)].reshape(len(weights), -1))
+
+
+def load_atlas(path=ATLAS_DIR):
+    """The atlas stored at `path`, or None if it has not been built.
+
+    An atlas built from other tables (see tables.data_checksum()) is not
+    used either; build_atlas() builds it again.
+    """
+    # one cache entry per directory however it is spelled; abspath, unlike
+    # Path.resolve(), needs no file system calls on the query_one() path
+    return _load_atlas(os.path.abspath(path))
+
+
+@lru_cache(maxsize=None)
+def _load_atlas(path):
+    try:
+        atlas = Atlas.load(path)
+    except FileNotFoundError:
+        return None
+    return atlas if atlas.checksum == data_checksum() else None
+
+
+on_reload(_load_atlas.cache_clear)
+
+
+def query(columns, path=ATLAS_DIR):
+    """K_H and B of designs given as columns, interpolated in the atlas where possible.
+
+    Rows outside the atlas (other system types, inputs off the grid, or no
+    atlas built yet) fall back to the exact batch evaluation; `exact` marks them.
+    """
+    columns = broadcast_columns(columns)
+    # the atlas is tabulated over the screed conductivity including fixing inserts
+    lookup = dict(columns, k_E=_effective_k_E(columns["k_E"], columns["psi"], columns["k_W"]))
+    atlas = load_atlas(path)
+    inside = atlas.covers(lookup) if atlas is not None else np.zeros(columns["W"].shape, bool)
+
+    K_H_Floor = np.empty(inside.shape)
+    K_H_Floor_star = np.empty(inside.shape)
+    B = np.empty(inside.shape)
+    if inside.any():
+        rows = {name: values[inside] for name, values in lookup.items()}
+        K_H_Floor[inside], K_H_Floor_star[inside], B[inside] = atlas.floor_values(rows)
+    if not inside.all():
+        rows = {name: values[~inside] for name, values in columns.items()}
+        K_H, B_rows = calc_K_H_floor(rows, R_k_b=np.array([[0.0], [R_K_B_STAR]]))
+        K_H_Floor[~inside], K_H_Floor_star[~inside] = K_H
+        B[~inside] = B_rows[1]
+
+    floor_alfa = f.alfa("floor heating")
+    alfa = v.alfa(columns["case_of_application"])
+    K_H = calc_K_H(K_H_Floor, K_H_Floor_star, columns["R_k_B"], alfa, floor_alfa)
+    return {"K_H": K_H, "B": B, "exact": ~inside}
+
+
+def query_one(path=ATLAS_DIR, **inputs):
+    """K_H and B of one design, given like EmbeddedRadiantSystem keyword arguments.
+
+    Falls back to the exact evaluation outside the atlas, as query() does.
+    """
+    design = {**DEFAULTS, **inputs}
+    atlas = load_atlas(path)
+    if (
+        atlas is not None
+        and design["system_type"] in ATLAS_TYPES
+        and design["wall_thickness"] == atlas.wall_thickness
+        and design["d_M"] <= design["external_diameter"]
+    ):
+        k_E = design["k_E"]
+        if 0.05 <= design["psi"] <= 0.15:
+            k_E = f.k_E_prim(design["psi"], k_E, design["k_W"])
+        floor = atlas.point(
+            design["W"], design["s_u"], k_E, design["external_diameter"], design["conductivity"]
+        )
+        alfa = f.alfa(design["case_of_application"])
+        if floor is not None and alfa is not None:
+            K_H_Floor, K_H_Floor_star, B = floor.tolist()
+            floor_alfa = f.alfa("floor heating")
+            K_H = calc_K_H(K_H_Floor, K_H_Floor_star, design["R_k_B"], alfa, floor_alfa)
+            return {"K_H": float(K_H), "B": B, "exact": False}
+    result = query({name: [value] for name, value in design.items()}, path)
+    return {"K_H": float(result["K_H"][0]), "B": float(result["B"][0]), "exact": True}
+
+
+if __name__ == "__main__":
+    print(build_atlas())
@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field, fields
+import numpy as np
+
+from . import functions as f
+from . import vectorized as v
+from .methodology import EmbeddedPipe, EmbeddedRadiantSystem
+
+PIPE_COLUMNS = ("external_diameter", "wall_thickness", "conductivity")
+INPUT_COLUMNS = (
+    "system_type",
+    "case_of_application",
+    "W",
+    *PIPE_COLUMNS,
+    "d_M",
+    "k_M",
+    "s_WL",
+    "k_WL",
+    "L_WL",
+    "s_u",
+    "R_k_B",
+    "k_E",
+    "psi",
+    "k_W",
+    "t_i",
+    "t_V",
+    "t_R",
+)
+TEXT_COLUMNS = ("system_type", "case_of_application")
+RESULT_COLUMNS = ("K_H", "B", "deltat_H", "q")
+SYSTEM_TYPES = "ABCDHIJ"
+R_K_B_STAR = 0.15
+
+
+def default_columns():
+    """Inputs of a default EmbeddedRadiantSystem, keyed by column name."""
+    defaults = {x.name: x.default for x in fields(EmbeddedRadiantSystem) if x.init}
+    defaults.update({x.name: x.default for x in fields(EmbeddedPipe)})
+    return {name: defaults[name] for name in INPUT_COLUMNS}
+
+
+def broadcast_columns(columns):
+    """Complete `columns` with the defaults and broadcast them to one 1-D length."""
+    values = default_columns()
+    values.update({name: columns[name] for name in INPUT_COLUMNS if name in columns})
+    arrays = [
+        np.asarray(values[name], dtype=str if name in TEXT_COLUMNS else float)
+        for name in INPUT_COLUMNS
+    ]
+    return {
+        name: np.atleast_1d(array).ravel()
+        for name, array in zip(INPUT_COLUMNS, np.broadcast_arrays(*arrays))
+    }
+
+
+def K_H_ACHIJ(R_k_b, W, s_u, k_E, psi, k_W, D, k_R, d_a, s_R, floor_alfa=10.8):
+    """Floor K_H and B for system types A, C, H, I, J."""
+    k_E = np.where((0.05 <= psi) & (psi <= 0.15), v.k_E_prim(psi, k_E, k_W), k_E)
+
+    a_B = v.a_B1(floor_alfa, k_E, R_k_b)
+    a_W = v.a_W1(R_k_b)
+    m_U = v.m_U(s_u)
+    m_D = v.m_D(D)
+
+    # beyond 0.375 m the tables are read at 0.375 m and q8 scales the result
+    W_t = np.minimum(W, 0.375)
+    a_U = v.a_U1(R_k_b, W_t)
+    a_D = v.a_D(R_k_b, W_t)
+    m_W = v.m_W(W_t)
+
+    a_i = [a_B, a_W, a_U, a_D]
+    m_i = [1, m_W, m_U, m_D]
+
+    B = v.B1(B_0=6.7, a_i=a_i, m_i=m_i, W=W_t, k_R=k_R, d_a=d_a, s_R=s_R)
+    K_H = v.q5(B, a_i, m_i, 1)
+    return np.where(W <= 0.375, K_H, v.q8(K_H, W)), B
+
+
+def a_WL_full(K_WL, W, D):
+    """a_WL of a heat diffusion device as wide as W, and a_WL at K_WL = 0, for type B."""
+    # one interpolation pass for the device and for K_WL = 0
+    a_WL, a_0 = v.a_WL2(np.stack(np.broadcast_arrays(K_WL, 0.0)), W, D)
+    return np.where(K_WL < 0.5, a_WL, v.a_WL3(K_WL, W, D, a_0)), a_0
+
+
+def K_H_B(R_k_b, W, s_u, k_E, s_WL, k_WL, L_WL, D, k_R, d_a, s_R, floor_alfa=10.8):
+    """Floor K_H and B for system type B."""
+    a_U = v.a_U2(floor_alfa, s_u, k_E)
+    a_W = v.a_W2(s_u, k_E)
+    b_u = v.b_u(W)
+    a_K = v.a_K(W)
+    K_WL = v.K_WL(s_WL, k_WL, b_u, s_u, k_E)
+
+    # spacings outside 0.05 - 0.45 m are not covered by the method
+    m_W = np.where((0.05 <= W) & (W <= 0.45), v.m_W(R_k_b), np.nan)
+
+    a_WL, a_0 = a_WL_full(K_WL, W, D)
+    a_WL = np.where(L_WL < W, v.a_WL1(a_WL, a_0, L_WL, W), a_WL)
+
+    a_B = v.a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_b, W)
+
+    a_i = [a_B, a_W, a_U, a_WL, a_K]
+    m_i = [1, m_W, 1, 1, 1]
+
+    B = v.B1(B_0=6.5, a_i=a_i, m_i=m_i, W=W, k_R=k_R, d_a=d_a, s_R=s_R)
+    return v.q5(B, a_i, m_i, 1), B
+
+
+def K_H_D(R_k_b, s_u, k_E, floor_alfa=10.8):
+    """Floor K_H and B for system type D."""
+    a_U = v.a_U2(floor_alfa, s_u, k_E)
+    a_B = v.a_B3(a_U, R_k_b)
+
+    a_i = [a_B, 1.06, a_U]
+    m_i = [1, 1, 1]
+
+    B = np.full(np.shape(a_B), 6.5)
+    return v.q5(B, a_i, m_i, 1), B
+
+
+def calc_K_H_floor(columns, R_k_b):
+    """Floor K_H and B of every row, evaluated per system type group.
+
+    An R_k_b of shape (m, 1) gives (m, n) results in one pass over the tables.
+    """
+    system_type = columns["system_type"]
+    shape = np.broadcast_shapes(np.shape(R_k_b), system_type.shape)
+    K_H = np.full(shape, np.nan)
+    B = np.full(shape, np.nan)
+
+    for types in ("ACHIJ", "B", "D"):
+        index = np.flatnonzero(np.isin(system_type, list(types)))
+        if not index.size:
+            continue
+        c = {name: values[index] for name, values in columns.items()}
+        pipe = dict(
+            D=np.maximum(c["external_diameter"], c["d_M"]),
+            k_R=c["conductivity"],
+            d_a=c["external_diameter"],
+            s_R=c["wall_thickness"],
+        )
+        if types == "ACHIJ":
+            K_H[..., index], B[..., index] = K_H_ACHIJ(
+                R_k_b, c["W"], c["s_u"], c["k_E"], c["psi"], c["k_W"], **pipe
+            )
+        elif types == "B":
+            K_H[..., index], B[..., index] = K_H_B(
+                R_k_b, c["W"], c["s_u"], c["k_E"], c["s_WL"], c["k_WL"], c["L_WL"], **pipe
+            )
+        else:
+            K_H[..., index], B[..., index] = K_H_D(R_k_b, c["s_u"], c["k_E"])
+    return K_H, B
+
+
+def calc_K_H(K_H_Floor, K_H_Floor_star, R_k_B, alfa, floor_alfa=10.8):
+    """K_H from the floor values at R_k_b = 0 and R_k_b* for any covering and alfa."""
+    deltaR_alfa = 1 / alfa - 1 / floor_alfa
+    return v.K_H2(K_H_Floor, deltaR_alfa, R_k_B, K_H_Floor_star, R_K_B_STAR)
+
+
+@dataclass
+class EmbeddedRadiantSystemBatch:
+    """Struct-of-arrays counterpart of EmbeddedRadiantSystem.
+
+    Every field holds one value per design (scalars are broadcast); the pipe
+    is given by its external_diameter, wall_thickness and conductivity columns.
+    """
+
+    system_type: np.ndarray
+    case_of_application: np.ndarray
+    W: np.ndarray
+    external_diameter: np.ndarray
+    wall_thickness: np.ndarray
+    conductivity: np.ndarray
+    d_M: np.ndarray
+    k_M: np.ndarray
+    s_WL: np.ndarray
+    k_WL: np.ndarray
+    L_WL: np.ndarray
+    s_u: np.ndarray
+    R_k_B: np.ndarray
+    k_E: np.ndarray
+    psi: np.ndarray
+    k_W: np.ndarray
+    t_i: np.ndarray
+    t_V: np.ndarray
+    t_R: np.ndarray
+
+    K_H_Floor: np.ndarray = field(init=False)  # Floor K_H at R_k_b = 0 [W/m2K]
+    K_H_Floor_star: np.ndarray = field(init=False)  # Floor K_H at R_k_b* [W/m2K]
+    K_H: np.ndarray = field(init=False)  # Equivalent heat transmission coefficient.
+    B: np.ndarray = field(init=False)  # System dependent coefficient [W/m2K]
+    deltat_H: np.ndarray = field(init=False)  # Medium differential temperature [K]
+    q: np.ndarray = field(init=False)  # Heat flux [W/m2]
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build a batch from a mapping of columns, e.g. a pandas DataFrame.
+
+        Missing columns take the EmbeddedRadiantSystem defaults.
+        """
+        return cls(**broadcast_columns(columns))
+
+    @classmethod
+    def from_systems(cls, systems):
+        columns = {name: [] for name in INPUT_COLUMNS}
+        for system in systems:
+            for name in INPUT_COLUMNS:
+                source = system.embedded_pipe if name in PIPE_COLUMNS else system
+                columns[name].append(getattr(source, name))
+        return cls(**columns)
+
+    def cases_of_application(self):
+        """K_H and q of every row for every case of application, reusing the floor values."""
+        cases = {}
+        for case, alfa in f.ALFA_SWITCHER.items():
+            K_H = calc_K_H(self.K_H_Floor, self.K_H_Floor_star, self.R_k_B, alfa, self.floor_alfa)
+            cases[case] = {"K_H": K_H, "q": K_H * self.deltat_H}
+        return cases
+
+    def covering_sweep(self, R_k_B):
+        """K_H and q of every row (axis 0) for every covering resistance R_k_B (axis 1)."""
+        R_k_B = np.asarray(R_k_B, dtype=float)[None, :]
+        K_H = calc_K_H(
+            self.K_H_Floor[:, None], self.K_H_Floor_star[:, None], R_k_B,
+            self.alfa[:, None], self.floor_alfa,
+        )
+        return {"R_k_B": R_k_B[0], "K_H": K_H, "q": K_H * self.deltat_H[:, None]}
+
+    def columns(self):
+        return {name: getattr(self, name) for name in INPUT_COLUMNS}
+
+    def results(self):
+        return {name: getattr(self, name) for name in RESULT_COLUMNS}
+
+    def __post_init__(self) -> None:
+        for name, values in broadcast_columns(self.columns()).items():
+            setattr(self, name, values)
+
+        unknown = set(np.unique(self.system_type)) - set(SYSTEM_TYPES)
+        if unknown:
+            raise ValueError(f"There is no K_H for system types: {sorted(unknown)}")
+
+        self.floor_alfa = f.alfa("floor heating")
+        self.alfa = v.alfa(self.case_of_application)
+        columns = self.columns()
+        K_H_Floor, B = calc_K_H_floor(columns, R_k_b=np.array([[0.0], [R_K_B_STAR]]))
+        self.K_H_Floor, self.K_H_Floor_star = K_H_Floor
+        self.B = B[1]
+        self.K_H = calc_K_H(
+            self.K_H_Floor, self.K_H_Floor_star, self.R_k_B, self.alfa, self.floor_alfa
+        )
+        self.deltat_H = v.deltat_H(self.t_V, self.t_R, self.t_i)
+        self.q = self.K_H * self.deltat_H
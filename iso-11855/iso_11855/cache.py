@@ -0,0 +1,200 @@
+"""Content-addressed disk cache of floor values, shared across processes and restarts.
+
+Designs are keyed by the SHA-256 of their canonical inputs: names sorted,
+numbers as floats rounded to NORMALIZE_DIGITS significant digits, the pipe
+inputs spelled out and the a_WL2 method and FAST_KERNELS flag added. The
+floor values K_H_Floor, K_H_Floor_star and B, the part of an
+EmbeddedRadiantSystem that runs the spline pipeline, are stored in SQLite
+under the key of the floor inputs.
+The least recently used entries are evicted beyond max_bytes, and the whole
+cache is cleared when the coefficient tables change (see version()).
+
+enable() makes every EmbeddedRadiantSystem consult the cache after the
+in-memory floor cache.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from . import functions as f
+from . import methodology
+from .methodology import FLOOR_INPUTS, K_H_INPUTS, TEMPERATURE_INPUTS
+from .tables import data_checksum
+
+CACHE_FORMAT = 2
+NORMALIZE_DIGITS = 12  # Significant digits of the floats in a key
+DEFAULT_PATH = Path(
+    os.environ.get("ISO_11855_CACHE", Path.home() / ".cache" / "iso_11855.sqlite")
+)
+DEFAULT_MAX_BYTES = 64 * 2**20
+TOUCH_BATCH = 256  # Reads between writes of their last use
+PIPE_INPUTS = ("external_diameter", "wall_thickness", "conductivity")
+INPUTS = FLOOR_INPUTS + K_H_INPUTS + TEMPERATURE_INPUTS
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if value == 0:
+        return 0.0  # -0.0 too
+    return float(f"{value:.{NORMALIZE_DIGITS}g}")
+
+
+def canonical_inputs(system, inputs=INPUTS):
+    """Inputs of an EmbeddedRadiantSystem as a sorted JSON string; names are left out."""
+    values = {"a_WL2_method": f.A_WL2_METHOD, "fast_kernels": f.FAST_KERNELS}
+    for name in inputs:
+        if name == "embedded_pipe":
+            pipe = system.embedded_pipe
+            values.update({f"pipe_{x}": _normalize(getattr(pipe, x)) for x in PIPE_INPUTS})
+        else:
+            values[name] = _normalize(getattr(system, name))
+    return json.dumps(values, sort_keys=True, separators=(",", ":"))
+
+
+def content_key(system, inputs=INPUTS):
+    """Stable SHA-256 of the canonical inputs of an EmbeddedRadiantSystem."""
+    return hashlib.sha256(canonical_inputs(system, inputs).encode()).hexdigest()
+
+
+def version():
+    """Stamp of the cached data: cache format and checksum of the coefficient tables."""
+    return f"{CACHE_FORMAT}:{data_checksum()}"
+
+
+class DiskCache:
+    """Tuples of floats by key in the SQLite file `path`, LRU-bounded to max_bytes."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.used = {}  # Last use of the entries read, written with the next put
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, used INTEGER)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value)"
+            )
+        self.check_version()
+
+    def check_version(self):
+        """Empty the cache if it was filled with other tables or another cache format."""
+        with self.lock, self.connection:
+            stamp = self.connection.execute(
+                "SELECT value FROM meta WHERE name = 'version'"
+            ).fetchone()
+            if stamp is None or stamp[0] != version():
+                self.connection.execute("DELETE FROM entries")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version(),)
+                )
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('size', 0)")
+                self.used.clear()
+
+    def close(self):
+        with self.lock, self.connection:
+            self._touch()
+        self.connection.close()
+
+    def _touch(self):
+        self.connection.executemany(
+            "UPDATE entries SET used = ? WHERE key = ?",
+            [(used, key) for key, used in self.used.items()],
+        )
+        self.used.clear()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size(self):
+        """Bytes held by the entries."""
+        with self.lock:
+            return self._size()
+
+    def _size(self, change=0):
+        # running total of the entry sizes, kept in meta so all processes share it
+        if change:
+            self.connection.execute(
+                "UPDATE meta SET value = value + ? WHERE name = 'size'", (change,)
+            )
+        return self.connection.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.used[key] = time.time_ns()
+            if len(self.used) >= TOUCH_BATCH:
+                with self.connection:
+                    self._touch()
+        return tuple(np.frombuffer(row[0], dtype="<f8").tolist())
+
+    def put(self, key, values):
+        value = np.asarray(values, dtype="<f8").tobytes()
+        size = len(key) + len(value)
+        with self.lock, self.connection:
+            self._touch()
+            old = self.connection.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time_ns()),
+            )
+            total = self._size(size - (old[0] if old else 0))
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+
+    def _evict(self, excess):
+        # oldest entries first, until their sizes add up to the excess
+        rows = self.connection.execute("SELECT key, size FROM entries ORDER BY used")
+        keys, freed = [], 0
+        for key, size in rows:
+            keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self._size(-freed)
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.execute("UPDATE meta SET value = 0 WHERE name = 'size'")
+
+
+def floor_key(system):
+    return content_key(system, FLOOR_INPUTS)
+
+
+def enable(path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    """Keep the floor values of every EmbeddedRadiantSystem in the disk cache at `path`."""
+    disable()
+    methodology.DISK_CACHE = DiskCache(path, max_bytes)
+    return methodology.DISK_CACHE
+
+
+def disable():
+    cache, methodology.DISK_CACHE = methodology.DISK_CACHE, None
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,222 @@
+"""Command line batch evaluation: python -m iso_11855 designs.csv results.csv
+
+Reads one EmbeddedRadiantSystem per row from a CSV or Parquet file, in
+chunks, and writes the inputs with K_H, B, deltat_H, q and the limit curve
+results to a CSV or Parquet file. Columns named as in INPUT_COLUMNS are
+inputs (pipe inputs as in EmbeddedPipe); missing inputs and empty cells
+keep the defaults and any other column (e.g. a room name) is copied to the
+output unchanged.
+"""
+
+import argparse
+from collections import deque
+import csv
+from pathlib import Path
+import sys
+import time
+import numpy as np
+
+from .batch import INPUT_COLUMNS, TEXT_COLUMNS, default_columns
+from .limits import DEFAULT_T_F_MAX
+from .sweep import DEFAULT_CHUNK_SIZE, evaluate_chunks, pa, pq
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+
+
+def file_format(path):
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"{path}: expected a .csv or .parquet file") from None
+
+
+def _columns(names, rows, path, lines):
+    # empty input cells keep the default, like missing input columns
+    defaults = default_columns()
+    columns = {}
+    for k, name in enumerate(names):
+        values = [row[k] for row in rows]
+        if name not in INPUT_COLUMNS:
+            columns[name] = np.array(values, dtype=str)
+            continue
+        values = [defaults[name] if value == "" else value for value in values]
+        if name in TEXT_COLUMNS:
+            columns[name] = np.array(values, dtype=str)
+            continue
+        try:
+            columns[name] = np.array(values, dtype=float)
+        except ValueError:
+            for line, value in zip(lines, values):
+                try:
+                    float(value)
+                except ValueError:
+                    raise ValueError(
+                        f"{path}, line {line}, column {name}: {value!r} is not a number"
+                    ) from None
+    return columns
+
+
+def read_csv(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Columns of a CSV file, `chunk_size` rows at a time.
+
+    Blank lines are skipped; every other row must have a cell for each
+    column of the header. A file with only a header gives one empty chunk.
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        names = next(reader, None)
+        if names is None:
+            raise ValueError(f"{path} is empty, expected a header row")
+        rows, lines, yielded = [], [], False
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(names):
+                raise ValueError(
+                    f"{path}, line {reader.line_num}: {len(row)} cells, expected {len(names)}"
+                )
+            rows.append(row)
+            lines.append(reader.line_num)
+            if len(rows) == chunk_size:
+                yield _columns(names, rows, path, lines)
+                rows, lines, yielded = [], [], True
+        if rows or not yielded:
+            yield _columns(names, rows, path, lines)
+
+
+def read_parquet(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Columns of a Parquet file, `chunk_size` rows at a time.
+
+    A file without rows gives one empty chunk.
+    """
+    if pq is None:
+        raise ImportError("Parquet input needs pyarrow")
+    parquet = pq.ParquetFile(path)
+    yielded = False
+    for batch in parquet.iter_batches(batch_size=chunk_size):
+        yield {
+            name: np.asarray(column.to_numpy(zero_copy_only=False))
+            for name, column in zip(batch.schema.names, batch.columns)
+        }
+        yielded = True
+    if not yielded:
+        yield _columns(parquet.schema_arrow.names, [], path, [])
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = None
+
+    def write(self, columns):
+        if self.writer is None:
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(columns)
+        self.writer.writerows(zip(*(values.tolist() for values in columns.values())))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        if pq is None:
+            raise ImportError("Parquet output needs pyarrow")
+        self.path = path
+        self.writer = None
+
+    def write(self, columns):
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+READERS = {"csv": read_csv, "parquet": read_parquet}
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def run(
+    source,
+    target,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_workers=None,
+    t_F_max=DEFAULT_T_F_MAX,
+    log=None,
+):
+    """Evaluate every design of the file `source` and write the results to `target`.
+
+    Progress and throughput are written to the stream `log` after every
+    chunk. Returns the number of designs evaluated.
+    """
+    parts = READERS[file_format(source)](source, chunk_size)
+    writer = WRITERS[file_format(target)](target)
+
+    # columns that are no inputs wait here for the results of their chunk
+    extras = deque()
+
+    def inputs():
+        for part in parts:
+            extras.append({k: values for k, values in part.items() if k not in INPUT_COLUMNS})
+            yield {k: values for k, values in part.items() if k in INPUT_COLUMNS}
+
+    n = 0
+    start = time.perf_counter()
+    try:
+        for results in evaluate_chunks(inputs(), max_workers=max_workers, t_F_max=t_F_max):
+            writer.write({**extras.popleft(), **results})
+            n += len(results["q"])
+            if log is not None:
+                elapsed = time.perf_counter() - start
+                print(f"{n} designs, {n / elapsed:,.0f} designs/s", file=log, flush=True)
+    finally:
+        writer.close()
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m iso_11855",
+        description="Evaluate ISO 11855 embedded radiant systems, one design per row.",
+    )
+    parser.add_argument("source", help="designs, .csv or .parquet")
+    parser.add_argument("target", help="results, .csv or .parquet")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="designs per chunk"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--t-F-max",
+        type=float,
+        default=DEFAULT_T_F_MAX,
+        help=f"maximum floor surface temperature for the limit curves (default: {DEFAULT_T_F_MAX})",
+    )
+    parser.add_argument("--quiet", action="store_true", help="do not report progress")
+    args = parser.parse_args(argv)
+
+    try:
+        file_format(args.source)
+        file_format(args.target)
+    except ValueError as error:
+        parser.error(str(error))
+    start = time.perf_counter()
+    try:
+        n = run(
+            args.source,
+            args.target,
+            chunk_size=args.chunk_size,
+            max_workers=args.workers,
+            t_F_max=args.t_F_max,
+            log=None if args.quiet else sys.stderr,
+        )
+    except ValueError as error:  # malformed input file
+        parser.exit(1, f"{parser.prog}: error: {error}\n")
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        print(f"Wrote {n} designs to {args.target} in {elapsed:.1f} s", file=sys.stderr)
@@ -1,10 +1,76 @@
-from math import exp, log, sqrt, prod, e, pi
-import numpy as np
-from scipy.interpolate import CubicSpline, RectBivariateSpline, interpn
+from bisect import bisect_right
+from math import exp, expm1, log, sqrt, prod, e, pi, nan
+import threading
+from scipy.interpolate import CubicSpline, RectBivariateSpline, RegularGridInterpolator
+
+from .kernels import HornerKernel
+from .tables import on_reload, table
+
+
+# Interpolators of the Annex A tables (see tables.py) are fitted once, on first
+# use, and shared between calls and threads.
+
+_interpolator_builders = {}
+_interpolators = {}
+_interpolators_lock = threading.Lock()
+
+
+def register_interpolator(name):
+    def decorator(builder):
+        _interpolator_builders[name] = builder
+        return builder
+
+    return decorator
+
+
+def interpolator(name, **options):
+    """Shared interpolator of table `name`, built lazily on the first call.
+
+    Builder `options` (e.g. an interpolation method) get one cached
+    interpolator per combination.
+    """
+    key = (name, *sorted(options.items()))
+    try:
+        return _interpolators[key]
+    except KeyError:
+        pass
+    with _interpolators_lock:
+        if key not in _interpolators:
+            _interpolators[key] = _interpolator_builders[name](**options)
+        return _interpolators[key]
+
+
+# With FAST_KERNELS the 1-D curves are evaluated by the Horner kernels of
+# kernels.py, which return plain floats for scalar arguments.
+FAST_KERNELS = False
+CURVES = ("a_W1", "a_W2", "a_K", "b_u", "a_WL_inf", "B_G2", "n_G2")
+_kernels = {}
+
+
+@on_reload
+def _clear_interpolators():
+    with _interpolators_lock:
+        _interpolators.clear()
+        _kernels.clear()
+
+
+def curve(name):
+    """1-D curve `name`: its CubicSpline, or its Horner kernel with FAST_KERNELS."""
+    if not FAST_KERNELS:
+        return interpolator(name)
+    try:
+        return _kernels[name]
+    except KeyError:
+        return _kernels.setdefault(name, HornerKernel(interpolator(name)))
+
+
+def kernel_report():
+    """Largest deviation of every curve kernel from its spline."""
+    return {name: HornerKernel(interpolator(name)).max_deviation for name in CURVES}
 
 
 def q1(t_S_m, t_i):
-    return 8.92 * (t_S_m - t_i) ^ 1.1
+    return 8.92 * (t_S_m - t_i) ** 1.1
 
 
 def q2(t_S_m, t_i):
@@ -19,6 +85,17 @@ def q4(t_S_m, t_i):
     return 7 * abs(t_S_m - t_i)
 
 
+# q1 to q4 as q = c * |t_S_m - t_i| ** n: (c, n) by case of application
+SURFACE_FLUX = {
+    "floor heating": (8.92, 1.1),
+    "wall heating": (8, 1),
+    "ceiling heating": (6, 1),
+    "floor cooling": (7, 1),
+    "wall cooling": (8, 1),
+    "ceiling cooling": (8.92, 1.1),
+}
+
+
 def power_product(a_i, m_i) -> float:
     return prod([a**m for a, m in zip(a_i, m_i)])
 
@@ -38,6 +115,15 @@ def deltat_H(t_V, t_R, t_i):
     return (t_V - t_R) / log((t_V - t_i) / (t_R - t_i))
 
 
+# Inverse of deltat_H: supply temperature for the spread sigma = t_V - t_R
+
+
+def t_V(deltat_H, t_i, sigma):
+    if sigma == 0:
+        return t_i + deltat_H
+    return t_i - sigma / expm1(-sigma / deltat_H)
+
+
 # Function A.2 = Function 5
 
 
@@ -203,214 +289,173 @@ def deltaR_h(alfa):
     return 1 / alfa - 1 / 10.8
 
 
+@register_interpolator("a_W1")
+def _a_W1():
+    t = table("a_W1")
+    return CubicSpline(t["R_k_B"], t["a_W"])
+
+
 def a_W1(R_k_B):
-    x_R_k_B = [0.0, 0.05, 0.1, 0.15]
-    y_a_W = [1.23, 1.188, 1.156, 1.134]
-    cs = CubicSpline(x_R_k_B, y_a_W)
-    return cs(R_k_B)
+    return curve("a_W1")(R_k_B)
+
+
+@register_interpolator("a_U1")
+def _a_U1():
+    t = table("a_U1")
+    return RectBivariateSpline(t["R_k_B"], t["W"], t["a_U"].T, kx=3, ky=3)
 
 
 def a_U1(R_k_B, W):
-    x_R_k_B = [0.0, 0.05, 0.1, 0.15]
-    y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375]
-    z_a_U = [
-        [1.069, 1.056, 1.043, 1.037],
-        [1.066, 1.053, 1.041, 1.035],
-        [1.063, 1.050, 1.039, 1.0335],
-        [1.057, 1.046, 1.035, 1.0305],
-        [1.051, 1.041, 1.0315, 1.0275],
-        [1.048, 1.038, 1.0295, 1.026],
-        [1.0395, 1.031, 1.024, 1.021],
-        [1.03, 1.0221, 1.0181, 1.015],
-    ]
-    cs = RectBivariateSpline(x_R_k_B, y_W, np.array(z_a_U).T, kx=3, ky=3)
-    return float(cs.ev(R_k_B, W))
+    return float(interpolator("a_U1").ev(R_k_B, W))
+
+
+@register_interpolator("a_D")
+def _a_D():
+    t = table("a_D")
+    return RectBivariateSpline(t["R_k_B"], t["W"], t["a_D"].T, kx=3, ky=3)
 
 
 def a_D(R_k_B, W):
-    x_R_k_B = [0.0, 0.05, 0.1, 0.15]
-    y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375]
-    z_a_D = [
-        [1.013, 1.013, 1.012, 1.011],
-        [1.021, 1.019, 1.016, 1.014],
-        [1.029, 1.025, 1.022, 1.018],
-        [1.040, 1.034, 1.029, 1.024],
-        [1.046, 1.040, 1.035, 1.030],
-        [1.049, 1.043, 1.038, 1.033],
-        [1.053, 1.049, 1.044, 1.039],
-        [1.056, 1.051, 1.046, 1.042],
-    ]
-    cs = RectBivariateSpline(x_R_k_B, y_W, np.array(z_a_D).T, kx=3, ky=3)
-    return float(cs.ev(R_k_B, W))
+    return float(interpolator("a_D").ev(R_k_B, W))
+
+
+@register_interpolator("B_G1")
+def _B_G1():
+    t = table("B_G1")
+    return RectBivariateSpline(t["s_u_k_E"], t["W"], t["B_G"].T, kx=3, ky=3)
 
 
 def B_G1(s_u, k_E, W):
-    x_s_u_k_E = [0.01, 0.0208, 0.0292, 0.0375, 0.0458, 0.0542, 0.0625, 0.0708, 0.0792]
-    y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375]
-    z_B_G = [
-        [85.0, 91.5, 96.8, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0],
-        [75.3, 83.5, 89.9, 96.3, 99.5, 100.0, 100.0, 100.0, 100.0],
-        [66.0, 75.4, 82.9, 89.3, 95.5, 98.8, 100.0, 100.0, 100.0],
-        [51.0, 61.1, 69.2, 76.3, 82.7, 87.5, 91.8, 95.1, 97.8],
-        [38.5, 48.2, 56.2, 63.1, 69.1, 74.5, 81.3, 86.4, 90.0],
-        [33.0, 42.5, 49.5, 56.5, 62.0, 67.5, 75.3, 81.6, 86.1],
-        [20.5, 26.8, 31.6, 36.4, 51.5, 47.5, 57.5, 65.3, 72.4],
-        [11.5, 13.7, 15.5, 18.2, 21.5, 27.5, 40.0, 49.1, 58.3],
-    ]
-    cs = RectBivariateSpline(x_s_u_k_E, y_W, np.array(z_B_G).T, kx=3, ky=3)
-    return float(cs.ev(s_u / k_E, W))
+    return float(interpolator("B_G1").ev(s_u / k_E, W))
+
+
+@register_interpolator("B_G2")
+def _B_G2():
+    t = table("B_G2")
+    return CubicSpline(t["s_u_W"], t["B_G"])
 
 
 def B_G2(s_u, W):
     x = s_u / W
     if x <= 0.7:
-        x_s_u_W = [0.173, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7]
-        y_B_G = [27.5, 40, 57.5, 69.5, 78.2, 84.5, 88.3, 91.6, 94, 96.3, 98.6, 99.8]
-        cs = CubicSpline(x_s_u_W, y_B_G)
-        return cs(x)
+        return curve("B_G2")(x)
     else:
         return 100.0
 
 
+@register_interpolator("n_G1")
+def _n_G1():
+    t = table("n_G1")
+    return RectBivariateSpline(t["s_u_k_E"], t["W"], t["n_G"].T, kx=3, ky=3)
+
+
 def n_G1(s_u, k_E, W):
-    x_s_u_k_E = [0.01, 0.0208, 0.0292, 0.0375, 0.0458, 0.0542, 0.0625, 0.0708, 0.0792]
-    y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.2625, 0.3, 0.3375, 0.375]
-    z_n_G = [
-        [0.008, 0.005, 0.002, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-        [0.024, 0.021, 0.018, 0.011, 0.002, 0.0, 0.0, 0.0, 0.0],
-        [0.046, 0.043, 0.041, 0.033, 0.014, 0.005, 0.0, 0.0, 0.0],
-        [0.088, 0.085, 0.082, 0.076, 0.055, 0.038, 0.024, 0.014, 0.006],
-        [0.131, 0.130, 0.129, 0.123, 0.105, 0.083, 0.057, 0.040, 0.028],
-        [0.155, 0.154, 0.153, 0.146, 0.130, 0.110, 0.077, 0.056, 0.041],
-        [0.197, 0.196, 0.196, 0.190, 0.173, 0.150, 0.110, 0.083, 0.062],
-        [0.254, 0.253, 0.253, 0.245, 0.228, 0.195, 0.145, 0.114, 0.086],
-        [0.322, 0.321, 0.321, 0.310, 0.293, 0.260, 0.187, 0.148, 0.115],
-        [0.422, 0.421, 0.421, 0.405, 0.385, 0.325, 0.230, 0.183, 0.142],
-    ]
-    cs = RectBivariateSpline(x_s_u_k_E, y_W, np.array(z_n_G).T, kx=3, ky=3)
-    return float(cs.ev(s_u / k_E, W))
+    return float(interpolator("n_G1").ev(s_u / k_E, W))
+
+
+@register_interpolator("n_G2")
+def _n_G2():
+    t = table("n_G2")
+    return CubicSpline(t["s_u_W"], t["n_G"])
 
 
 def n_G2(s_u, W):
     x = s_u / W
     if x <= 0.7:
-        x_s_u_W = [0.173, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7]
-        y_n_G = [0.32,0.23,0.145,0.097,0.067,0.048,0.033,0.023,0.015,0.009,0.005,0.002]
-        cs = CubicSpline(x_s_u_W, y_n_G)
-        return cs(x)
+        return curve("n_G2")(x)
     else:
         return 0.0
 
 
+@register_interpolator("a_W2")
+def _a_W2():
+    t = table("a_W2")
+    return CubicSpline(t["s_u_k_E"], t["a_W"])
+
+
 def a_W2(s_u, k_E):
-    x_s_u_k_E = [0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.08, 0.1, 0.15, 0.18]
-    y_a_W = [1.103, 1.1, 1.097, 1.094, 1.091, 1.088, 1.082, 1.075, 1.064, 1.059]
-    cs = CubicSpline(x_s_u_k_E, y_a_W)
-    return cs(s_u / k_E)
+    return curve("a_W2")(s_u / k_E)
+
+
+@register_interpolator("b_u")
+def _b_u():
+    t = table("b_u")
+    return CubicSpline(t["W"], t["b_u"])
 
 
 def b_u(W):
     if W <= 0.1:
         return 1.0
     elif W < 0.45:
-        x_W = [0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-        y_b_u = [1.0, 0.7, 0.5, 0.43, 0.25, 0.1, 0.0]
-        cs = CubicSpline(x_W, y_b_u)
-        return cs(W)
+        return curve("b_u")(W)
     else:
         return 0.0
 
 
-def a_WL2(K_WL, W, D):
-    x_K_WL = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5]
-    y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-    z_D = [0.014, 0.016, 0.018, 0.020, 0.022]
-    a_WL = [
-        [  # Table A.11 for K_WL = 0.0
-            [0.82, 0.86, 0.9, 0.93, 0.96],
-            [0.59, 0.644, 0.7, 0.754, 0.8],
-            [0.488, 0.533, 0.576, 0.617, 0.658],
-            [0.387, 0.415, 0.444, 0.47, 0.505],
-            [0.337, 0.357, 0.379, 0.4, 0.422],
-            [0.32, 0.34, 0.357, 0.376, 0.396],
-            [0.288, 0.3, 0.315, 0.33, 0.344],
-            [0.266, 0.278, 0.29, 0.3, 0.312],
-            [0.25, 0.264, 0.28, 0.29, 0.3],
-        ],
-        [  # Table A.12 for K_WL = 0.1
-            [0.88, 0.905, 0.93, 0.955, 0.975],
-            [0.74, 0.776, 0.812, 0.836, 0.859],
-            [0.66, 0.693, 0.726, 0.76, 0.77],
-            [0.561, 0.58, 0.6, 0.621, 0.642],
-            [0.49, 0.51, 0.53, 0.55, 0.57],
-            [0.467, 0.485, 0.504, 0.522, 0.54],
-            [0.435, 0.444, 0.453, 0.462, 0.472],
-            [0.411, 0.421, 0.434, 0.446, 0.46],
-            [0.41, 0.42, 0.43, 0.44, 0.45],
-        ],
-        [  # Table A.13 for K_WL = 0.2
-            [0.92, 0.937, 0.955, 0.97, 0.985],
-            [0.845, 0.865, 0.885, 0.893, 0.902],
-            [0.81, 0.821, 0.832, 0.843, 0.855],
-            [0.735, 0.745, 0.755, 0.765, 0.775],
-            [0.68, 0.688, 0.695, 0.703, 0.71],
-            [0.655, 0.663, 0.67, 0.678, 0.685],
-            [0.585, 0.592, 0.6, 0.608, 0.615],
-            [0.55, 0.558, 0.565, 0.573, 0.58],
-            [0.55, 0.555, 0.56, 0.565, 0.57],
-        ],
-        [  # Table A.14 for K_WL = 0.3
-            [0.95, 0.96, 0.97, 0.98, 0.99],
-            [0.92, 0.925, 0.93, 0.935, 0.94],
-            [0.9, 0.905, 0.91, 0.915, 0.92],
-            [0.855, 0.855, 0.855, 0.855, 0.855],
-            [0.8, 0.8, 0.8, 0.8, 0.8],
-            [0.79, 0.79, 0.79, 0.79, 0.79],
-            [0.72, 0.72, 0.72, 0.72, 0.72],
-            [0.69, 0.69, 0.69, 0.69, 0.69],
-            [0.68, 0.68, 0.68, 0.68, 0.68],
-        ],
-        [  # Table A.15 for K_WL = 0.4
-            [0.97, 0.978, 0.985, 0.99, 0.995],
-            [0.965, 0.964, 0.963, 0.962, 0.96],
-            [0.94, 0.94, 0.94, 0.94, 0.94],
-            [0.895, 0.895, 0.895, 0.895, 0.895],
-            [0.86, 0.86, 0.86, 0.86, 0.86],
-            [0.84, 0.84, 0.84, 0.84, 0.84],
-            [0.78, 0.78, 0.78, 0.78, 0.78],
-            [0.76, 0.76, 0.76, 0.76, 0.76],
-            [0.75, 0.75, 0.75, 0.75, 0.75],
-        ],
-        [  # Table A.16 for K_WL >= 0.5
-            [0.995, 0.995, 0.995, 0.995, 0.995],
-            [0.979, 0.979, 0.979, 0.979, 0.979],
-            [0.963, 0.963, 0.963, 0.963, 0.963],
-            [0.924, 0.924, 0.924, 0.924, 0.924],
-            [0.894, 0.894, 0.894, 0.894, 0.894],
-            [0.88, 0.88, 0.88, 0.88, 0.88],
-            [0.83, 0.83, 0.83, 0.83, 0.83],
-            [0.815, 0.815, 0.815, 0.815, 0.815],
-            [0.81, 0.81, 0.81, 0.81, 0.81],
-        ],
-    ]
-    points = (x_K_WL, y_W, z_D)
-    point = np.array([K_WL, W, D])
-    # xyz change linear interpolation to quadratic spline
-    result = interpn(points, a_WL, point, method="linear", bounds_error=False)
-    return float(result) if np.isscalar(result) else float(result.item())
+# Interpolation over Tables A.11 to A.16: "linear" or a higher-order
+# RegularGridInterpolator method such as "cubic" or "pchip"
+A_WL2_METHOD = "linear"
+
+
+@register_interpolator("a_WL2")
+def _a_WL2(method="linear"):
+    t = table("a_WL2")  # Tables A.11 to A.16, one per K_WL
+    points = (t["K_WL"], t["W"], t["D"])
+    return RegularGridInterpolator(points, t["a_WL"], method=method, bounds_error=False)
+
+
+@register_interpolator("a_WL2_trilinear")
+def _a_WL2_trilinear():
+    """Direct trilinear kernel for single points, same result as the linear method."""
+    t = table("a_WL2")
+    axes = [t[name].tolist() for name in ("K_WL", "W", "D")]
+    a_WL = t["a_WL"].tolist()
+
+    def kernel(K_WL, W, D):
+        cell = []
+        for x, axis in zip((K_WL, W, D), axes):
+            if not axis[0] <= x <= axis[-1]:
+                return nan
+            i = min(bisect_right(axis, x), len(axis) - 1) - 1
+            cell.append((i, (x - axis[i]) / (axis[i + 1] - axis[i])))
+        (i, u), (j, v), (k, w) = cell
+        result = 0.0
+        for plane, weight_u in ((a_WL[i], 1 - u), (a_WL[i + 1], u)):
+            for row, weight_v in ((plane[j], 1 - v), (plane[j + 1], v)):
+                result += weight_u * weight_v * (row[k] * (1 - w) + row[k + 1] * w)
+        return result
+
+    return kernel
+
+
+def a_WL2(K_WL, W, D, method=None):
+    method = method or A_WL2_METHOD
+    if method == "linear":
+        return interpolator("a_WL2_trilinear")(K_WL, W, D)
+    return float(interpolator("a_WL2", method=method)([K_WL, W, D])[0])
+
+
+@register_interpolator("a_WL_inf")
+def _a_WL_inf():
+    t = table("a_WL_inf")
+    return CubicSpline(t["W"], t["a_WL_inf"])
 
 
 def a_WL_inf(W):
-    x_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-    y_a_WL_inf = [1, 1.01, 1.02, 1.04, 1.06, 1.07, 1.09, 1.1, 1.1]
-    cs = CubicSpline(x_W, y_a_WL_inf)
-    return cs(W)
+    return curve("a_WL_inf")(W)
+
 
+@register_interpolator("a_WL3")
+def _a_WL3():
+    t = table("a_WL3")
+    return RectBivariateSpline(t["K_WL"], t["W"], t["a_WL"].T, kx=3, ky=3)
 
-def a_WL3(K_WL, W, D):
+
+def a_WL3(K_WL, W, D, a_WL_KL_0=None):
     if K_WL > 1:
         a_WL_KL_inf = a_WL_inf(W)
-        a_WL_KL_0 = a_WL2(K_WL=0, W=W, D=D)
+        if a_WL_KL_0 is None:
+            a_WL_KL_0 = a_WL2(K_WL=0, W=W, D=D)
         return (
             a_WL_KL_inf
             - (a_WL_KL_inf - a_WL_KL_0)
@@ -418,88 +463,51 @@ def a_WL3(K_WL, W, D):
         )
 
     else:  # 0.5 <= K_WL <= 1
-        x_K_WL = [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
-        y_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-        z_a_WL = [
-            [0.995, 0.998, 1.0, 1.0, 1.0, 1.0],
-            [0.979, 0.984, 0.99, 0.995, 0.998, 1.0],
-            [0.963, 0.972, 0.98, 0.988, 0.995, 1.0],
-            [0.924, 0.945, 0.96, 0.974, 0.99, 1.0],
-            [0.894, 0.921, 0.943, 0.961, 0.98, 1.0],
-            [0.88, 0.908, 0.934, 0.955, 0.975, 1.0],
-            [0.83, 0.87, 0.91, 0.94, 0.97, 1.0],
-            [0.815, 0.86, 0.9, 0.93, 0.97, 1.0],
-            [0.81, 0.86, 0.9, 0.93, 0.97, 1.0],
-        ]
-        cs = RectBivariateSpline(x_K_WL, y_W, np.array(z_a_WL).T, kx=3, ky=3)
-        return float(cs.ev(K_WL, W))
+        return float(interpolator("a_WL3").ev(K_WL, W))
+
+
+@register_interpolator("a_K")
+def _a_K():
+    t = table("a_K")
+    return CubicSpline(t["W"], t["a_K"])
 
 
 def a_K(W):
-    x_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-    y_a_K = [1.0, 0.99, 0.98, 0.95, 0.92, 0.9, 0.82, 0.72, 0.60]
-    cs = CubicSpline(x_W, y_a_K)
-    return cs(W)
+    return curve("a_K")(W)
+
+
+@register_interpolator("B_G3")
+def _B_G3():
+    t = table("B_G3")
+    return RectBivariateSpline(t["W"], t["K_WL"], t["B_G"].T, kx=3, ky=3)
 
 
 def B_G3(K_WL, W):
-    x_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-    y_K_WL = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 1.4, 1.5]
-    z_B_G = [
-        [92.0, 86.7, 79.4, 64.8, 50.8, 45.8, 27.5, 9.9, 0.0],
-        [93.1, 88.0, 81.3, 67.5, 54.2, 49.0, 31.8, 15.8, 2.4],
-        [94.2, 89.5, 83.3, 70.2, 57.6, 52.5, 36.0, 21.3, 7.0],
-        [95.4, 90.7, 85.2, 72.9, 60.8, 56.0, 40.2, 25.7, 11.9],
-        [96.6, 92.1, 87.2, 75.6, 64.1, 59.3, 44.4, 30.0, 16.6],
-        [97.8, 93.7, 89.2, 78.3, 67.3, 62.6, 48.6, 34.1, 21.1],
-        [98.7, 95.0, 91.0, 81.0, 70.6, 66.3, 52.8, 38.5, 25.5],
-        [99.3, 96.3, 93.0, 83.7, 74.0, 69.7, 57.0, 42.8, 29.6],
-        [99.8, 97.7, 95.0, 86.3, 77.2, 73.0, 61.2, 47.0, 33.6],
-        [100, 98.5, 96.5, 89.0, 80.7, 76.6, 65.4, 51.4, 37.3],
-        [100, 99.3, 97.8, 91.5, 84.0, 80.0, 69.4, 55.6, 40.9],
-        [100, 99.6, 98.5, 93.8, 87.2, 83.3, 73.2, 59.8, 44.3],
-        [100, 99.8, 99.3, 95.8, 90.0, 86.3, 76.6, 63.8, 47.5],
-        [100, 100, 99.8, 97.5, 92.5, 89.0, 80.0, 67.3, 50.5],
-        [100, 100, 100, 98.6, 94.8, 91.7, 83.0, 71.0, 53.4],
-    ]
-    cs = RectBivariateSpline(x_W, y_K_WL, np.array(z_B_G).T, kx=3, ky=3)
-    return float(cs.ev(W, K_WL))
+    return float(interpolator("B_G3").ev(W, K_WL))
+
+
+@register_interpolator("n_G3")
+def _n_G3():
+    t = table("n_G3")
+    return RectBivariateSpline(t["W"], t["K_WL"], t["n_G"].T, kx=3, ky=3)
 
 
 def n_G3(K_WL, W):
-    x_W = [0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45]
-    y_K_WL = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 1.4, 1.5]
-    z_n_G = [
-        [0.0029, 0.017, 0.032, 0.067, 0.122, 0.151, 0.235, 0.333, 1.0],
-        [0.0024, 0.015, 0.027, 0.055, 0.097, 0.12, 0.184, 0.288, 0.725],
-        [0.0021, 0.013, 0.024, 0.048, 0.086, 0.104, 0.169, 0.256, 0.482],
-        [0.0018, 0.012, 0.022, 0.044, 0.08, 0.095, 0.156, 0.228, 0.38],
-        [0.0015, 0.011, 0.02, 0.04, 0.074, 0.088, 0.143, 0.204, 0.31],
-        [0.0012, 0.0099, 0.018, 0.037, 0.067, 0.082, 0.131, 0.183, 0.25],
-        [0.0009, 0.0087, 0.016, 0.033, 0.061, 0.074, 0.118, 0.162, 0.21],
-        [0.0006, 0.0074, 0.014, 0.03, 0.055, 0.067, 0.106, 0.144, 0.187],
-        [0.0003, 0.0062, 0.012, 0.027, 0.049, 0.06, 0.095, 0.126, 0.165],
-        [0.0, 0.005, 0.01, 0.024, 0.044, 0.053, 0.083, 0.11, 0.143],
-        [0.0, 0.0038, 0.008, 0.021, 0.038, 0.046, 0.072, 0.096, 0.121],
-        [0.0, 0.0025, 0.006, 0.018, 0.032, 0.038, 0.063, 0.084, 0.107],
-        [0.0, 0.0012, 0.004, 0.015, 0.027, 0.034, 0.054, 0.073, 0.093],
-        [0.0, 0.0, 0.002, 0.012, 0.022, 0.029, 0.047, 0.063, 0.080],
-        [0.0, 0.0, 0.0, 0.009, 0.02, 0.025, 0.04, 0.055, 0.07],
-    ]
-    cs = RectBivariateSpline(x_W, y_K_WL, np.array(z_n_G).T, kx=3, ky=3)
-    return float(cs.ev(W, K_WL))
+    return float(interpolator("n_G3").ev(W, K_WL))
+
+
+ALFA_SWITCHER = {
+    "floor heating": 10.8,
+    "wall heating": 8,
+    "ceiling heating": 6.5,
+    "floor cooling": 6.5,
+    "wall cooling": 8,
+    "ceiling cooling": 10.8,
+}
 
 
 def alfa(case_of_application="floor heating"):
-    switcher = {
-        "floor heating": 10.8,
-        "wall heating": 8,
-        "ceiling heating": 6.5,
-        "floor cooling": 6.5,
-        "wall cooling": 8,
-        "ceiling cooling": 10.8,
-    }
-    return switcher.get(case_of_application.lower())
+    return ALFA_SWITCHER.get(case_of_application.lower())
 
 
 def R_t1(R_z, R_w, R_r, R_x):
@@ -0,0 +1,324 @@
+"""Exact partial derivatives of K_H and q by forward-mode differentiation.
+
+Every input is seeded as a Dual number carrying its partial derivatives.
+The formulas of functions.py (power_product, m_W, m_U, m_D, K_H2, ...) then
+propagate them unchanged; only the table lookups, which use the spline
+derivatives, and the formulas calling math.log or math.sqrt have Dual
+counterparts here. One pass gives K_H, q and their full gradients.
+
+The floor K_H functions below mirror those of methodology.py, which work on
+floats, so gradients() checks its K_H and q against the system's own.
+
+Where the method is not smooth the derivatives are one-sided:
+- at the knots of Tables A.11 to A.16 (e.g. D = 0.016 m, W = 0.1 m), where
+  the trilinear a_WL2 of type B has a kink, they are those of the cell
+  above (below at the last knot);
+- at K_WL = 0.5 and 1 they are those of the a_WL3 table, the branch
+  between the two switches;
+- at W = 0.375 m (types A, C, H, I, J), psi = 0.05 and 0.15, and
+  W = 0.1 and 0.45 m for b_u, they are those of the branch that includes
+  the switch point;
+- where d_M equals the external pipe diameter (the default), all of the
+  derivative by D goes to external_diameter and none to d_M.
+"""
+
+from dataclasses import dataclass
+from bisect import bisect_right
+import math
+import numpy as np
+
+from . import functions as f
+
+PIPE_INPUTS = ("external_diameter", "wall_thickness", "conductivity")
+CHECK_TOLERANCE = 1e-9  # Relative difference allowed from the K_H and q of methodology.py
+GRADIENT_INPUTS = (
+    "W", "s_u", "R_k_B", "k_E", "psi", "k_W", "d_M", "s_WL", "k_WL", "L_WL",
+    *PIPE_INPUTS, "t_i", "t_V", "t_R",
+)
+
+
+class Dual:
+    """A value and its partial derivatives with respect to the seeded inputs."""
+
+    __slots__ = ("value", "grad")
+    __array_ufunc__ = None  # NumPy scalars defer to the Dual operators
+
+    def __init__(self, value, grad):
+        self.value = value
+        self.grad = grad
+
+    def __repr__(self):
+        return f"Dual({self.value!r}, {self.grad!r})"
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.grad + other.grad)
+        return Dual(self.value + other, self.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.grad - other.grad)
+        return Dual(self.value - other, self.grad)
+
+    def __rsub__(self, other):
+        return Dual(other - self.value, -self.grad)
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(
+                self.value * other.value, self.grad * other.value + other.grad * self.value
+            )
+        return Dual(self.value * other, self.grad * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            value = self.value / other.value
+            return Dual(value, (self.grad - value * other.grad) / other.value)
+        return Dual(self.value / other, self.grad / other)
+
+    def __rtruediv__(self, other):
+        value = other / self.value
+        return Dual(value, -value / self.value * self.grad)
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            value = self.value**other.value
+            return Dual(
+                value,
+                value * (other.grad * math.log(self.value) + other.value / self.value * self.grad),
+            )
+        if other == 0:
+            return 1.0
+        return Dual(self.value**other, other * self.value ** (other - 1) * self.grad)
+
+    def __rpow__(self, other):
+        value = other**self.value
+        return Dual(value, value * math.log(other) * self.grad)
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __lt__(self, other):
+        return self.value < value(other)
+
+    def __le__(self, other):
+        return self.value <= value(other)
+
+    def __gt__(self, other):
+        return self.value > value(other)
+
+    def __ge__(self, other):
+        return self.value >= value(other)
+
+
+def value(x):
+    return x.value if isinstance(x, Dual) else x
+
+
+def _chain(x, result, derivative):
+    # result of a function of one variable, with its derivative at x
+    return Dual(result, derivative * x.grad) if isinstance(x, Dual) else result
+
+
+def log(x):
+    return _chain(x, math.log(value(x)), 1 / value(x))
+
+
+def sqrt(x):
+    root = math.sqrt(value(x))
+    return _chain(x, root, 0.5 / root)
+
+
+# Table lookups with spline derivatives
+
+
+def curve(name, x):
+    spline = f.interpolator(name)
+    return _chain(x, float(spline(value(x))), float(spline(value(x), 1)))
+
+
+def surface(name, x, y):
+    """Value of a 2-D table spline; constant beyond the table as in .ev()."""
+    spline = f.interpolator(name)
+    tx, ty = spline.get_knots()
+    x0, y0 = value(x), value(y)
+    result = float(spline.ev(x0, y0))
+    dx = float(spline.ev(x0, y0, dx=1)) if tx[0] <= x0 <= tx[-1] else 0.0
+    dy = float(spline.ev(x0, y0, dy=1)) if ty[0] <= y0 <= ty[-1] else 0.0
+    terms = [(z, d) for z, d in ((x, dx), (y, dy)) if isinstance(z, Dual)]
+    if not terms:
+        return result
+    return Dual(result, sum(d * z.grad for z, d in terms))
+
+
+def a_WL2(K_WL, W, D):
+    """Trilinear interpolation in Tables A.11 to A.16 with its partials."""
+    if f.A_WL2_METHOD != "linear":
+        raise ValueError(f"Gradients need the linear a_WL2 method, not {f.A_WL2_METHOD!r}")
+    t = f.table("a_WL2")
+    point = [value(x) for x in (K_WL, W, D)]
+    cell = []
+    for x, axis in zip(point, (t["K_WL"], t["W"], t["D"])):
+        if not axis[0] <= x <= axis[-1]:
+            return math.nan
+        i = min(bisect_right(axis, x), len(axis) - 1) - 1
+        cell.append((i, axis[i + 1] - axis[i], (x - axis[i]) / (axis[i + 1] - axis[i])))
+    (i, hi, u), (j, hj, v), (k, hk, w) = cell
+    c = t["a_WL"][i : i + 2, j : j + 2, k : k + 2]
+    weights = [np.array([1 - u, u]), np.array([1 - v, v]), np.array([1 - w, w])]
+    slopes = [np.array([-1 / hi, 1 / hi]), np.array([-1 / hj, 1 / hj]), np.array([-1 / hk, 1 / hk])]
+    result = float(np.einsum("ijk,i,j,k", c, *weights))
+    grad = 0.0
+    for axis, x in enumerate((K_WL, W, D)):
+        if isinstance(x, Dual):
+            factors = [slopes[n] if n == axis else weights[n] for n in range(3)]
+            grad = grad + float(np.einsum("ijk,i,j,k", c, *factors)) * x.grad
+    return Dual(result, grad) if isinstance(grad, np.ndarray) else result
+
+
+def b_u(W):
+    if W <= 0.1:
+        return 1.0
+    elif W < 0.45:
+        return curve("b_u", W)
+    else:
+        return 0.0
+
+
+def a_WL3(K_WL, W, a_WL_KL_0):
+    if K_WL > 1:
+        a_WL_KL_inf = curve("a_WL_inf", W)
+        return a_WL_KL_inf - (a_WL_KL_inf - a_WL_KL_0) * (
+            (a_WL_KL_inf - 1) / (a_WL_KL_inf - a_WL_KL_0)
+        ) ** K_WL
+    return surface("a_WL3", K_WL, W)
+
+
+# Formulas of functions.py calling math.log or math.sqrt
+
+
+def B1(B_0, a_i, m_i, W, k_R, d_a, s_R):
+    k_R_0 = 0.35
+    s_R_0 = 0.002
+    x = 1 / B_0 + 1.1 / math.pi * f.power_product(a_i, m_i) * W * (
+        1 / (2 * k_R) * log(d_a / (d_a - 2 * s_R))
+        - 1 / (2 * k_R_0) * log(d_a / (d_a - 2 * s_R_0))
+    )
+    return 1 / x
+
+
+def a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_B, W, B=6.5):
+    return 1 / (1 + B * a_U * a_W**m_W * a_WL * a_K * R_k_B * (1 + 0.44 * sqrt(W)))
+
+
+def deltat_H(t_V, t_R, t_i):
+    return (t_V - t_R) / log((t_V - t_i) / (t_R - t_i))
+
+
+# Floor K_H, mirroring methodology.py
+
+
+def K_H_ACHIJ(x, R_k_b, floor_alfa, B_0, D):
+    k_E = f.k_E_prim(x["psi"], x["k_E"], x["k_W"]) if 0.05 <= x["psi"] <= 0.15 else x["k_E"]
+    a_B = f.a_B1(floor_alfa, k_E, R_k_b)
+    a_W = float(f.a_W1(R_k_b))
+    m_U = f.m_U(x["s_u"])
+    m_D = f.m_D(D)
+    W = x["W"] if x["W"] <= 0.375 else 0.375
+    a_U = surface("a_U1", R_k_b, W)
+    a_D = surface("a_D", R_k_b, W)
+    m_W = f.m_W(W)
+
+    a_i = [a_B, a_W, a_U, a_D]
+    m_i = [1, m_W, m_U, m_D]
+    B = B1(B_0, a_i, m_i, W, x["conductivity"], x["external_diameter"], x["wall_thickness"])
+    q_0375 = f.q5(B, a_i, m_i, 1)
+    return (q_0375 if x["W"] <= 0.375 else f.q8(q_0375, x["W"])), B
+
+
+def K_H_B(x, R_k_b, floor_alfa, B_0, D):
+    W, s_u, k_E = x["W"], x["s_u"], x["k_E"]
+    a_U = f.a_U2(floor_alfa, s_u, k_E)
+    a_W = curve("a_W2", s_u / k_E)
+    a_K = curve("a_K", W)
+    K_WL = f.K_WL(x["s_WL"], x["k_WL"], b_u(W), s_u, k_E)
+
+    if 0.05 <= W <= 0.45:
+        m_W = f.m_W(R_k_b)
+    else:
+        raise ValueError(f"Pipe spacing W = {value(W)} m is outside 0.05 - 0.45 m")
+
+    a_0 = a_WL2(0.0, W, D)
+    a_WL = a_WL2(K_WL, W, D) if K_WL < 0.5 else a_WL3(K_WL, W, a_0)
+    if x["L_WL"] < W:
+        a_WL = f.a_WL1(a_WL, a_0, x["L_WL"], W)
+
+    a_B = a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_b, W)
+    a_i = [a_B, a_W, a_U, a_WL, a_K]
+    m_i = [1, m_W, 1, 1, 1]
+    B = B1(B_0, a_i, m_i, W, x["conductivity"], x["external_diameter"], x["wall_thickness"])
+    return f.q5(B, a_i, m_i, 1), B
+
+
+def K_H_D(x, R_k_b, floor_alfa, B_0, D):
+    a_U = f.a_U2(floor_alfa, x["s_u"], x["k_E"])
+    a_B = f.a_B3(a_U, R_k_b)
+    return f.q5(B_0, [a_B, 1.06, a_U], [1, 1, 1], 1), B_0
+
+
+@dataclass
+class Gradients:
+    K_H: float  # Equivalent heat transmission coefficient [W/m2K]
+    q: float  # Heat flux [W/m2]
+    dK_H: dict  # Partial derivatives of K_H by input name
+    dq: dict  # Partial derivatives of q by input name
+
+
+def gradients(system, inputs=GRADIENT_INPUTS):
+    """K_H and q of an EmbeddedRadiantSystem with their partials with respect to `inputs`.
+
+    Pipe inputs are named as in EmbeddedPipe. Derivatives are one-sided at
+    the switches of the method and the table knots, see the module docstring.
+    Raises RuntimeError if K_H or q differ from those of the system.
+    """
+    unknown = set(inputs) - set(GRADIENT_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+    seeds = np.eye(len(inputs))
+    x = {
+        name: getattr(system.embedded_pipe if name in PIPE_INPUTS else system, name)
+        for name in GRADIENT_INPUTS
+    }
+    x.update({name: Dual(float(x[name]), seeds[i]) for i, name in enumerate(inputs)})
+
+    if system.system_type in "ACHIJ":
+        floor = K_H_ACHIJ
+    elif system.system_type == "B":
+        floor = K_H_B
+    else:
+        floor = K_H_D
+    D = x["external_diameter"] if x["external_diameter"] >= x["d_M"] else x["d_M"]
+    K_H_Floor, _ = floor(x, 0, system.floor_alfa, system.B_0, D)
+    K_H_Floor_star, _ = floor(x, 0.15, system.floor_alfa, system.B_0, D)
+    deltaR_alfa = 1 / system.alfa - 1 / system.floor_alfa
+    K_H = f.K_H2(K_H_Floor, deltaR_alfa, x["R_k_B"], K_H_Floor_star, 0.15)
+    q = K_H * deltat_H(x["t_V"], x["t_R"], x["t_i"])
+
+    for name, result in (("K_H", K_H), ("q", q)):
+        expected = getattr(system, name)
+        if not math.isclose(value(result), expected, rel_tol=CHECK_TOLERANCE) and not (
+            math.isnan(value(result)) and math.isnan(expected)
+        ):
+            raise RuntimeError(
+                f"The gradient model gives {name} = {value(result)}, methodology.py {expected}"
+            )
+
+    def partials(result):
+        grad = result.grad if isinstance(result, Dual) else np.zeros(len(inputs))
+        return dict(zip(inputs, grad.tolist()))
+
+    return Gradients(K_H=value(K_H), q=value(q), dK_H=partials(K_H), dq=partials(q))
@@ -0,0 +1,232 @@
+"""Flows, pressure drops and balancing of the pipe circuits, after EN 1264-3.
+
+Every function works on arrays with one entry per circuit. Circuits hang on
+manifolds: balance() sets the valve presettings that give every circuit of
+a manifold the same pressure drop. solve_network() then finds the flows and
+pressure drops in the distribution pipes feeding the manifolds, a sparse
+nodal solve that also handles looped networks. circuits() builds the
+circuits of a project from its ProjectDesign.
+"""
+
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+C_W = 4190.0  # Specific heat capacity of water [J/kgK]
+PIPE_ROUGHNESS = 7e-6  # Absolute roughness of plastic pipes [m]
+MAX_CIRCUIT_LENGTH = 120.0  # Longest pipe loop of one circuit [m]
+DP_VALVE_MIN = 1000.0  # Pressure drop over the open valve of the index circuit [Pa]
+NETWORK_TOLERANCE = 1e-9  # Relative change of the pipe flows ending the network iteration
+NETWORK_MAX_ITERATIONS = 100
+
+
+# Water properties
+
+
+def water_density(t):
+    """Density of water [kg/m3] at t [*C] (Thiesen)."""
+    t = np.asarray(t, dtype=float)
+    return 1000 * (1 - (t + 288.9414) / (508929.2 * (t + 68.12963)) * (t - 3.9863) ** 2)
+
+
+def water_viscosity(t):
+    """Dynamic viscosity of water [Pa s] at t [*C] (Vogel)."""
+    return 2.414e-5 * 10 ** (247.8 / (np.asarray(t, dtype=float) + 273.15 - 140))
+
+
+# Circuits
+
+
+def mass_flow(q, area, sigma, t_i=None, R_o=None, R_u=None, t_u=None):
+    """Design mass flow [kg/s] carrying heat flux q [W/m2] over area [m2] at the spread sigma.
+
+    Given the resistances above (R_o) and below (R_u) the pipes [m2K/W],
+    the indoor temperature t_i and the temperature below the floor t_u
+    [*C], the heat lost downwards is added as in EN 1264-3.
+    """
+    q, area, sigma = (np.asarray(x, dtype=float) for x in (q, area, sigma))
+    factor = 1.0
+    if R_u is not None:
+        factor = 1 + R_o / R_u + (np.asarray(t_i) - t_u) / (q * R_u)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return area * q / (C_W * sigma) * factor
+
+
+def pipe_length(area, W, lead=0.0):
+    """Pipe length [m] covering area [m2] at spacing W [m], with both leads to the manifold."""
+    return np.asarray(area, dtype=float) / np.asarray(W, dtype=float) + 2 * np.asarray(lead)
+
+
+def friction_factor(Re, relative_roughness):
+    """Darcy friction factor: 64 / Re when laminar, Swamee-Jain above Re = 2300."""
+    Re = np.asarray(Re, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        laminar = 64 / Re
+        turbulent = 0.25 / np.log10(relative_roughness / 3.7 + 5.74 / Re**0.9) ** 2
+    return np.where(Re < 2300, laminar, turbulent)
+
+
+def pressure_drop(m, length, d_i, t, roughness=PIPE_ROUGHNESS, zeta=0.0):
+    """Darcy-Weisbach pressure drop [Pa] of mass flow m [kg/s] in a pipe of inner diameter d_i [m].
+
+    `zeta` adds local losses (bends, fittings) in velocity heads; t is the
+    mean water temperature [*C].
+    """
+    m, length, d_i = (np.asarray(x, dtype=float) for x in (m, length, d_i))
+    rho = water_density(t)
+    area = np.pi / 4 * d_i**2
+    velocity = m / (rho * area)
+    Re = np.abs(m) * d_i / (area * water_viscosity(t))
+    f = friction_factor(np.maximum(Re, 1e-12), roughness / d_i)
+    return (f * length / d_i + zeta) * rho * velocity * np.abs(velocity) / 2
+
+
+@dataclass
+class Balancing:
+    dp_manifold: np.ndarray  # Pressure drop over each manifold, index circuit with open valve [Pa]
+    dp_valve: np.ndarray  # Pressure drop set at each circuit valve [Pa]
+    kv: np.ndarray  # Valve flow coefficient of each circuit [m3/h at 1 bar]
+    index: np.ndarray  # Index circuit of each manifold, -1 if none
+
+
+def balance(manifold, m, dp, t, dp_valve_min=DP_VALVE_MIN):
+    """Valve presettings giving every circuit of a manifold the same pressure drop.
+
+    `manifold` numbers the manifold of each circuit (0, 1, ...), m is the
+    circuit mass flow [kg/s] and dp its pressure drop without the valve
+    [Pa]. The circuit with the largest dp (the index circuit) gets the open
+    valve drop dp_valve_min; the valves of the others make up the rest.
+    dp_manifold and index have one entry per manifold number up to the
+    largest; numbers without a circuit with a flow get NaN and -1.
+    """
+    manifold = np.asarray(manifold, dtype=int)
+    dp = np.asarray(dp, dtype=float)
+    if manifold.size and manifold.min() < 0:
+        raise ValueError("Manifold numbers must not be negative")
+    n_manifolds = manifold.max(initial=-1) + 1
+    dp_max = np.full(n_manifolds, -np.inf)
+    np.fmax.at(dp_max, manifold, dp)  # circuits without a flow (NaN) are left out
+    dp_max[np.isneginf(dp_max)] = np.nan
+    dp_manifold = dp_max + dp_valve_min
+    dp_valve = dp_manifold[manifold] - dp
+
+    # kv = V / sqrt(dp / 1 bar), V in m3/h
+    volume_flow = 3600 * np.asarray(m, dtype=float) / water_density(t)
+    with np.errstate(divide="ignore"):
+        kv = volume_flow / np.sqrt(dp_valve / 1e5)
+    # the first circuit of each manifold by falling dp, NaN last
+    order = np.lexsort((-dp, manifold))
+    first = order[np.diff(manifold[order], prepend=-1) != 0]
+    index = np.full(n_manifolds, -1)
+    index[manifold[first]] = first
+    index[np.isnan(dp_max)] = -1
+    return Balancing(dp_manifold=dp_manifold, dp_valve=dp_valve, kv=kv, index=index)
+
+
+# Distribution network
+
+
+@dataclass
+class Network:
+    m: np.ndarray  # Mass flow of each pipe from its start to its end node [kg/s]
+    dp: np.ndarray  # Pressure drop of each pipe along its flow [Pa]
+    drop: np.ndarray  # Supply pressure drop from node 0 to each node [Pa]
+    iterations: int  # Linearizations until the flows settled
+
+    def pump(self, nodes, dp_manifold, return_factor=2.0):
+        """Pump pressure rise and the excess to throttle at each manifold [Pa].
+
+        The manifolds at `nodes` need dp_manifold (see Balancing); the return
+        pipes are taken to lose return_factor - 1 times the supply drop.
+        Manifolds without a flow (dp_manifold NaN) do not count.
+        """
+        required = return_factor * self.drop[np.asarray(nodes)] + np.asarray(dp_manifold)
+        dp_pump = np.nanmax(required)
+        return dp_pump, dp_pump - required
+
+
+def solve_network(start, end, length, d_i, demand, t, roughness=PIPE_ROUGHNESS, zeta=0.0):
+    """Flows and pressures of a supply network fed at node 0.
+
+    Pipe k joins the nodes start[k] and end[k] and demand gives the mass
+    flow drawn at every node [kg/s], e.g. by the manifolds. Trees and looped
+    networks are solved alike by the linear theory method: each pipe is
+    linearized as dp = g * m with its secant conductance at the current
+    flow, the sparse nodal balance A diag(1 / g) A^T drop = demand is solved
+    for the pressures and the flows are updated until they settle.
+    """
+    start, end = np.asarray(start), np.asarray(end)
+    demand = np.asarray(demand, dtype=float)
+    n_pipes = start.size
+    pipes = np.arange(n_pipes)
+    # node-pipe incidence, +1 where a pipe ends and -1 where it starts; node 0 is the source
+    A = sp.csr_matrix(
+        (np.r_[np.ones(n_pipes), -np.ones(n_pipes)], (np.r_[end, start], np.r_[pipes, pipes])),
+        shape=(demand.size, n_pipes),
+    )[1:]
+
+    m = np.zeros(n_pipes)
+    for iteration in range(1, NETWORK_MAX_ITERATIONS + 1):
+        m_g = np.maximum(np.abs(m), 1e-9)
+        g = pressure_drop(m_g, length, d_i, t, roughness, zeta) / m_g
+        drop = np.r_[0.0, spsolve((A @ sp.diags(1 / g) @ A.T).tocsc(), demand[1:])]
+        m_new = (drop[end] - drop[start]) / g
+        # halving the step keeps the linearization from oscillating
+        change = np.max(np.abs(m_new - m), initial=0.0)
+        m = m_new if iteration == 1 else 0.5 * (m + m_new)
+        if change <= NETWORK_TOLERANCE * max(np.max(np.abs(m), initial=0.0), 1e-12):
+            break
+    dp = pressure_drop(m, length, d_i, t, roughness, zeta)
+    drop = np.r_[0.0, spsolve((A @ A.T).tocsc(), A @ dp)]
+    return Network(m=m, dp=dp, drop=drop, iterations=iteration)
+
+
+# Circuits of a project
+
+
+@dataclass
+class Circuits:
+    room: np.ndarray  # Room index of each circuit
+    manifold: np.ndarray  # Manifold of each circuit
+    area: np.ndarray  # Area covered [m2]
+    length: np.ndarray  # Pipe length including the leads [m]
+    m: np.ndarray  # Design mass flow [kg/s]
+    t: np.ndarray  # Mean water temperature [*C]
+    velocity: np.ndarray  # Water velocity [m/s]
+    dp: np.ndarray  # Pressure drop of the pipe loop [Pa]
+
+
+def circuits(project, design, manifold, lead=0.0, max_length=MAX_CIRCUIT_LENGTH):
+    """Circuits of a Project with its ProjectDesign, rooms split into loops of at most max_length.
+
+    `manifold` numbers the manifold of each room and `lead` is the distance
+    from the manifold to each room [m]. Rooms without a feasible design get
+    NaN flows.
+    """
+    rooms = project.rooms
+    area = np.array([r.area if r.usable_area is None else r.usable_area for r in rooms])
+    lead = np.broadcast_to(np.asarray(lead, dtype=float), area.shape)
+    # every loop has its own leads, so the coil of a loop gets max_length - 2 * lead
+    coil = np.maximum(max_length - 2 * lead, 1.0)
+    loops = np.maximum(np.ceil(area / design.W / coil), 1).astype(int)
+
+    room = np.repeat(np.arange(len(rooms)), loops)
+    area = (area / loops)[room]
+    W, sigma = design.W[room], design.sigma[room]
+    length = pipe_length(area, W, lead[room])
+    m = mass_flow(design.q_des[room], area, sigma)
+    t = design.t_V - sigma / 2
+
+    pipe = project.system.embedded_pipe
+    d_i = pipe.external_diameter - 2 * pipe.wall_thickness
+    return Circuits(
+        room=room,
+        manifold=np.asarray(manifold)[room],
+        area=area,
+        length=length,
+        m=m,
+        t=t,
+        velocity=m / (water_density(t) * np.pi / 4 * d_i**2),
+        dp=pressure_drop(m, length, d_i, t),
+    )
@@ -0,0 +1,348 @@
+"""Compiled scalar kernel of the whole K_H pipeline, a_B1 to K_H2.
+
+The spline tables are baked into flat coefficient arrays: the 1-D curves
+as their piecewise cubics, the 2-D tables as their bicubic B-spline
+coefficients (evaluated by de Boor's algorithm, clamped to the table like
+RectBivariateSpline.ev) and Tables A.11 to A.16 for trilinear
+interpolation (the "linear" a_WL2 method only). The kernels reading them
+are compiled per set of tables (compile_kernels()), so rewritten tables
+(tables.reload_tables()) are baked and compiled again instead of staying
+frozen in stale code. With Numba (optional,
+pip install numba) the kernel is compiled with njit; without it the same
+code runs as plain Python on lists.
+"""
+
+from math import log, nan, pi, sqrt
+import numpy as np
+
+from . import functions as f
+from . import tables
+
+try:
+    from numba import njit
+
+    NUMBA = True
+except ImportError:  # optional (pip install numba), pure-Python fallback
+    NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+SYSTEM_CODES = {"A": 0, "C": 0, "H": 0, "I": 0, "J": 0, "B": 1, "D": 2}
+R_K_B_STAR = 0.15
+
+
+def _bake(values):
+    # Numba takes contiguous arrays; Python indexes lists faster
+    values = np.ascontiguousarray(values, dtype=float).ravel()
+    return values if NUMBA else values.tolist()
+
+
+def _curve_data(name):
+    spline = f.interpolator(name)
+    return _bake(spline.x), _bake(spline.c.T)
+
+
+def _bispline_data(name):
+    spline = f.interpolator(name)
+    if spline.degrees != (3, 3):
+        raise ValueError(f"The kernel evaluates bicubic splines only, {name} is not one")
+    tx, ty, c = spline.tck
+    return _bake(tx), _bake(ty), _bake(c)
+
+
+def bake_tables():
+    """Coefficients of every table the kernel reads, as one tuple."""
+    A_U1, A_D = _bispline_data("a_U1"), _bispline_data("a_D")
+    # a_U1 and a_D share their axes, so one basis evaluation serves both
+    if not all(np.array_equal(a, b) for a, b in zip(A_U1[:2], A_D[:2])):
+        raise ValueError("The kernel needs the a_U1 and a_D tables on the same knots")
+    t = f.table("a_WL2")
+    return (
+        _curve_data("a_W1"),
+        _curve_data("a_W2"),
+        _curve_data("b_u"),
+        _curve_data("a_K"),
+        _curve_data("a_WL_inf"),
+        (A_U1[0], A_U1[1], A_U1[2], A_D[2]),
+        _bispline_data("a_WL3"),
+        (_bake(t["K_WL"]), _bake(t["W"]), _bake(t["D"]), _bake(t["a_WL"])),
+    )
+
+
+@njit(cache=True)
+def _curve(x, knots, coefficients):
+    """Piecewise cubic, extended beyond the ends like CubicSpline."""
+    i = 0
+    while i < len(knots) - 2 and x >= knots[i + 1]:
+        i += 1
+    dx = x - knots[i]
+    c = 4 * i
+    return ((coefficients[c] * dx + coefficients[c + 1]) * dx + coefficients[c + 2]) * dx + (
+        coefficients[c + 3]
+    )
+
+
+@njit(cache=True)
+def _basis(t, x):
+    """Span and the four nonzero cubic B-splines at x, clamped to the knots.
+
+    de Boor's recurrence unrolled for degree 3, so nothing is allocated.
+    """
+    n = len(t) - 4
+    x = min(max(x, t[3]), t[n])
+    s = 3
+    while s < n - 1 and x >= t[s + 1]:
+        s += 1
+    left1, left2, left3 = x - t[s], x - t[s - 1], x - t[s - 2]
+    right1, right2, right3 = t[s + 1] - x, t[s + 2] - x, t[s + 3] - x
+    # degree 1
+    temp = 1.0 / (right1 + left1)
+    N0, N1 = right1 * temp, left1 * temp
+    # degree 2
+    temp = N0 / (right1 + left2)
+    N0, saved = right1 * temp, left2 * temp
+    temp = N1 / (right2 + left1)
+    N1, N2 = saved + right2 * temp, left1 * temp
+    # degree 3
+    temp = N0 / (right1 + left3)
+    N0, saved = right1 * temp, left3 * temp
+    temp = N1 / (right2 + left2)
+    N1, saved = saved + right2 * temp, left2 * temp
+    temp = N2 / (right3 + left1)
+    N2, N3 = saved + right3 * temp, left1 * temp
+    return s, N0, N1, N2, N3
+
+
+@njit(cache=True)
+def _bispline(x, y, tx, ty, c, c2):
+    """Bicubic spline from FITPACK knots and coefficients.
+
+    Evaluates a second coefficient set c2 on the same knots with the same
+    basis values.
+    """
+    i, x0, x1, x2, x3 = _basis(tx, x)
+    j, y0, y1, y2, y3 = _basis(ty, y)
+    ny = len(ty) - 4
+    at = (i - 3) * ny + j - 3
+    result = result2 = 0.0
+    for Nx in (x0, x1, x2, x3):
+        result += Nx * (y0 * c[at] + y1 * c[at + 1] + y2 * c[at + 2] + y3 * c[at + 3])
+        result2 += Nx * (y0 * c2[at] + y1 * c2[at + 1] + y2 * c2[at + 2] + y3 * c2[at + 3])
+        at += ny
+    return result, result2
+
+
+@njit(cache=True)
+def _cell(x, axis):
+    if not axis[0] <= x <= axis[len(axis) - 1]:
+        return -1, nan
+    i = 0
+    while i < len(axis) - 2 and x >= axis[i + 1]:
+        i += 1
+    return i, (x - axis[i]) / (axis[i + 1] - axis[i])
+
+
+@njit(cache=True)
+def _a_WL2(K_WL, W, D, K_WL_axis, W_axis, D_axis, a_WL):
+    """Trilinear interpolation in Tables A.11 to A.16, NaN outside."""
+    i, u = _cell(K_WL, K_WL_axis)
+    j, v = _cell(W, W_axis)
+    k, w = _cell(D, D_axis)
+    if i < 0 or j < 0 or k < 0:
+        return nan
+    nW, nD = len(W_axis), len(D_axis)
+    result = 0.0
+    for di in range(2):
+        weight_u = u if di else 1 - u
+        for dj in range(2):
+            weight_v = v if dj else 1 - v
+            at = ((i + di) * nW + j + dj) * nD + k
+            result += weight_u * weight_v * (a_WL[at] * (1 - w) + a_WL[at + 1] * w)
+    return result
+
+
+@njit(cache=True)
+def _B1(B_0, product, W, k_R, d_a, s_R):
+    x = 1 / B_0 + 1.1 / pi * product * W * (
+        1 / (2 * k_R) * log(d_a / (d_a - 2 * s_R)) - 1 / (2 * 0.35) * log(d_a / (d_a - 2 * 0.002))
+    )
+    return 1 / x
+
+
+@njit(cache=True)
+def _floor_D(R_k_b, s_u, k_E, floor_alfa):
+    a_U = (1 / floor_alfa + 0.045) / (1 / floor_alfa + s_u / k_E)
+    a_B = 1 / (1 + 6.5 * a_U * 1.06 * R_k_b)
+    return 6.5 * a_B * 1.06 * a_U, 6.5
+
+
+def compile_kernels(baked):
+    """floor_K_H, kernel and kernel_many with the tables `baked` (see bake_tables()).
+
+    Numba freezes the table arrays into the compiled code as constants, the
+    fastest way to read them, so these are compiled per set of tables and
+    not cached on disk.
+    """
+    A_W1, A_W2, B_U, A_K, A_WL_INF, A_U1_D, A_WL3, A_WL2 = baked
+
+    @njit
+    def floor_ACHIJ(R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, floor_alfa):
+        if 0.05 <= psi <= 0.15:
+            k_E = (1 - psi) * k_E + psi * k_W
+        a_B = (1 / floor_alfa + 0.045) / (1 / floor_alfa + 0.045 / k_E + R_k_b)
+        a_W = _curve(R_k_b, A_W1[0], A_W1[1])
+        m_U = 100 * (0.045 - s_u)
+        m_D = 250 * (D - 0.02)
+        W_t = min(W, 0.375)
+        a_U, a_D = _bispline(R_k_b, W_t, A_U1_D[0], A_U1_D[1], A_U1_D[2], A_U1_D[3])
+        m_W = 1 - W_t / 0.075
+        product = a_B * a_W**m_W * a_U**m_U * a_D**m_D
+        B = _B1(6.7, product, W_t, k_R, d_a, s_R)
+        return B * product * W_t / W, B
+
+    @njit
+    def floor_B(R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, s_WL, k_WL, L_WL, floor_alfa):
+        if not 0.05 <= W <= 0.45:
+            return nan, nan
+        a_U = (1 / floor_alfa + 0.045) / (1 / floor_alfa + s_u / k_E)
+        a_W = _curve(s_u / k_E, A_W2[0], A_W2[1])
+        if W <= 0.1:
+            b_u = 1.0
+        elif W < 0.45:
+            b_u = _curve(W, B_U[0], B_U[1])
+        else:
+            b_u = 0.0
+        a_K = _curve(W, A_K[0], A_K[1])
+        K_WL = (s_WL * k_WL + b_u * s_u * k_E) * 8
+        m_W = 1 - R_k_b / 0.075
+
+        a_0 = _a_WL2(0.0, W, D, A_WL2[0], A_WL2[1], A_WL2[2], A_WL2[3])
+        if K_WL < 0.5:
+            a_WL = _a_WL2(K_WL, W, D, A_WL2[0], A_WL2[1], A_WL2[2], A_WL2[3])
+        elif K_WL > 1:
+            a_inf = _curve(W, A_WL_INF[0], A_WL_INF[1])
+            a_WL = a_inf - (a_inf - a_0) * ((a_inf - 1) / (a_inf - a_0)) ** K_WL
+        else:
+            a_WL, _ = _bispline(K_WL, W, A_WL3[0], A_WL3[1], A_WL3[2], A_WL3[2])
+        if L_WL < W:
+            x = L_WL / W
+            a_WL = a_WL - (a_WL - a_0) * (1 - 3.2 * x + 3.4 * x * x - 1.2 * x * x * x)
+
+        a_B = 1 / (1 + 6.5 * a_U * a_W**m_W * a_WL * a_K * R_k_b * (1 + 0.44 * sqrt(W)))
+        product = a_B * a_W**m_W * a_U * a_WL * a_K
+        B = _B1(6.5, product, W, k_R, d_a, s_R)
+        return B * product, B
+
+    @njit
+    def floor_K_H(
+        code, R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, s_WL, k_WL, L_WL, floor_alfa
+    ):
+        """Floor K_H and B of a system type code (see SYSTEM_CODES)."""
+        if code == 0:
+            return floor_ACHIJ(R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, floor_alfa)
+        if code == 1:
+            return floor_B(R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, s_WL, k_WL, L_WL, floor_alfa)
+        return _floor_D(R_k_b, s_u, k_E, floor_alfa)
+
+    @njit
+    def kernel(
+        code, W, d_M, s_WL, k_WL, L_WL, s_u, R_k_B, k_E, psi, k_W, d_a, s_R, k_R, alfa,
+        floor_alfa,
+    ):
+        """K_H and B of one design, all inputs as numbers."""
+        D = max(d_a, d_M)
+        K_H_Floor, _ = floor_K_H(
+            code, 0.0, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, s_WL, k_WL, L_WL, floor_alfa
+        )
+        K_H_Floor_star, B = floor_K_H(
+            code, R_K_B_STAR, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, s_WL, k_WL, L_WL,
+            floor_alfa,
+        )
+        deltaR_alfa = 1 / alfa - 1 / floor_alfa
+        K_H = K_H_Floor / (
+            1 + ((deltaR_alfa + R_k_B) / R_K_B_STAR) * (K_H_Floor / K_H_Floor_star - 1)
+        )
+        return K_H, B
+
+    @njit
+    def kernel_many(
+        code, W, d_M, s_WL, k_WL, L_WL, s_u, R_k_B, k_E, psi, k_W, d_a, s_R, k_R, alfa,
+        floor_alfa,
+    ):
+        """kernel() over equally long 1-D arrays in one compiled loop."""
+        n = len(code)
+        K_H = np.empty(n)
+        B = np.empty(n)
+        for i in range(n):
+            K_H[i], B[i] = kernel(
+                code[i], W[i], d_M[i], s_WL[i], k_WL[i], L_WL[i], s_u[i], R_k_B[i], k_E[i],
+                psi[i], k_W[i], d_a[i], s_R[i], k_R[i], alfa[i], floor_alfa,
+            )
+        return K_H, B
+
+    return floor_K_H, kernel, kernel_many
+
+
+_compiled = (None, None)  # tables.GENERATION and compile_kernels() of those tables
+
+
+def kernels():
+    """compile_kernels() of the tables in use, compiled again after tables.reload_tables()."""
+    global _compiled
+    if f.A_WL2_METHOD != "linear":
+        raise ValueError(f"The kernel needs the linear a_WL2 method, not {f.A_WL2_METHOD!r}")
+    generation, compiled = _compiled
+    if generation != tables.GENERATION:
+        compiled = compile_kernels(bake_tables())
+        _compiled = (tables.GENERATION, compiled)
+    return compiled
+
+
+def floor_K_H(*args):
+    """Floor K_H and B: code, R_k_b, W, D, d_a, s_R, k_R, s_u, k_E, psi, k_W, s_WL, k_WL, L_WL,
+    floor_alfa."""
+    return kernels()[0](*args)
+
+
+def kernel(*args):
+    """K_H and B of one design: code, W, d_M, s_WL, k_WL, L_WL, s_u, R_k_B, k_E, psi, k_W,
+    d_a, s_R, k_R, alfa, floor_alfa."""
+    return kernels()[1](*args)
+
+
+def kernel_many(*args):
+    """kernel() over equally long 1-D arrays (floor_alfa a number) in one compiled loop."""
+    return kernels()[2](*args)
+
+
+def K_H(
+    system_type="A",
+    case_of_application="floor heating",
+    W=0.10,
+    d_M=0.016,
+    s_WL=0.002,
+    k_WL=50,
+    L_WL=0.1,
+    s_u=0.045,
+    R_k_B=0.05,
+    k_E=1.8,
+    psi=0.05,
+    k_W=0.5,
+    external_diameter=0.016,
+    wall_thickness=0.002,
+    conductivity=0.35,
+):
+    """K_H of one design, with the inputs and defaults of EmbeddedRadiantSystem."""
+    if system_type not in SYSTEM_CODES:
+        raise ValueError(f"There is no K_H for system type: {system_type}")
+    alfa = f.alfa(case_of_application)
+    if alfa is None:
+        raise ValueError(f"Unknown case of application: {case_of_application}")
+    return kernel(
+        SYSTEM_CODES[system_type], W, d_M, s_WL, k_WL, L_WL, s_u, R_k_B, k_E, psi, k_W,
+        external_diameter, wall_thickness, conductivity, alfa, f.alfa("floor heating"),
+    )[0]
@@ -0,0 +1,60 @@
+"""Horner kernels for the 1-D curves of Annex A.
+
+A HornerKernel holds the piecewise cubic of a fitted CubicSpline (its
+breakpoints and coefficients) and evaluates it without SciPy: plain floats
+for a scalar argument, NumPy arrays otherwise. The deviation from the
+spline is measured when the kernel is built.
+"""
+
+from bisect import bisect_right
+import numpy as np
+
+KERNEL_TOLERANCE = 1e-12  # Largest accepted deviation from the reference spline
+CHECK_POINTS = 64  # Check points per spline interval
+
+
+class HornerKernel:
+    def __init__(self, spline, tolerance=KERNEL_TOLERANCE):
+        self.x = np.array(spline.x, dtype=float)
+        self.c = np.array(spline.c, dtype=float)  # (4, intervals), highest power first
+        self._knots = self.x.tolist()
+        self._c = self.c.T.tolist()
+
+        # every interval, its end points and an extrapolated margin
+        width = self.x[-1] - self.x[0]
+        check = np.concatenate(
+            [np.linspace(a, b, CHECK_POINTS) for a, b in zip(self.x[:-1], self.x[1:])]
+            + [[self.x[0] - 0.05 * width, self.x[-1] + 0.05 * width]]
+        )
+        reference = spline(check)
+        self.max_deviation = max(
+            float(np.max(np.abs(self(check) - reference))),
+            max(abs(self(x) - y) for x, y in zip(check.tolist(), reference.tolist())),
+        )
+        if not self.max_deviation <= tolerance:
+            raise ValueError(
+                f"Kernel deviates {self.max_deviation:.3g} from its spline (> {tolerance:.3g})"
+            )
+
+    def __call__(self, x):
+        if isinstance(x, (float, int)):
+            # intervals beyond the ends extend the first and last polynomial
+            i = min(max(bisect_right(self._knots, x) - 1, 0), len(self._c) - 1)
+            c3, c2, c1, c0 = self._c[i]
+            dx = x - self._knots[i]
+            return ((c3 * dx + c2) * dx + c1) * dx + c0
+        x = np.asarray(x, dtype=float)
+        # interval index by counting the inner knots passed: with the few
+        # knots of these tables this beats a binary search on unsorted input
+        i = np.zeros(x.shape, dtype=np.intp)
+        for knot in self._knots[1:-1]:
+            i += x >= knot
+        c3, c2, c1, c0 = (c.take(i) for c in self.c)
+        dx = x - self.x.take(i)
+        result = c3 * dx
+        result += c2
+        result *= dx
+        result += c1
+        result *= dx
+        result += c0
+        return result
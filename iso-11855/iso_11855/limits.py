@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+import numpy as np
+
+from . import vectorized as v
+from .batch import a_WL_full, calc_K_H
+
+DEFAULT_T_F_MAX = 29.0  # Maximum floor surface temperature, occupied zone [*C]
+B_G_MAX = 100.0  # B_G where the screed fully spreads the heat [W/m2K]
+
+
+@dataclass
+class LimitCurves:
+    fi: np.ndarray  # Temperature factor of the limit curve
+    B_G: np.ndarray  # Limit curve coefficient [W/m2K]
+    n_G: np.ndarray  # Limit curve exponent
+    f_G: np.ndarray  # Correction of the limit curve for spacings above 0.375 m
+    scale: np.ndarray  # Factor for spacings above 0.375 m or narrow heat diffusion devices
+    q_G: np.ndarray  # Limiting heat flux [W/m2]
+    deltat_H_G: np.ndarray  # Limiting medium differential temperature [K]
+    exceeds: np.ndarray  # Design deltat_H above deltat_H_G, i.e. floor too hot
+
+    def sample(self, deltat_H):
+        """Limit curves q_G(deltat_H), one row per design, one column per deltat_H."""
+        deltat_H = np.asarray(deltat_H, dtype=float)[None, :]
+        fi, B_G, n_G, f_G, scale = (
+            x[:, None] for x in (self.fi, self.B_G, self.n_G, self.f_G, self.scale)
+        )
+        return scale * v.q_G1(fi, B_G, deltat_H / f_G, n_G)
+
+
+def _limit(fi, B_G, n_G, K_H):
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        deltat_H_G = fi * np.power(B_G / K_H, 1 / (1 - n_G))
+    return K_H * deltat_H_G, deltat_H_G
+
+
+def limits_ACHIJ(fi, K_H, W, s_u, k_E, psi, k_W):
+    k_E = np.where((0.05 <= psi) & (psi <= 0.15), v.k_E_prim(psi, k_E, k_W), k_E)
+
+    # the limit curves above 0.375 m follow from those at 0.375 m via f_G
+    W_t = np.minimum(W, 0.375)
+    thin = s_u / W_t <= 0.173
+    B_G = np.where(thin, v.B_G1(s_u, k_E, W_t), v.B_G2(s_u, W_t))
+    n_G = np.where(thin, v.n_G1(s_u, k_E, W_t), v.n_G2(s_u, W_t))
+
+    q_G_0375, deltat_H_G_0375 = _limit(fi, B_G, n_G, K_H * W / W_t)
+    f_G = np.where(W > 0.375, v.f_G(s_u, W, B_G_MAX * fi, q_G_0375), 1.0)
+    scale = W_t / W * f_G
+    return B_G, n_G, f_G, scale, q_G_0375 * scale, deltat_H_G_0375 * f_G
+
+
+def limits_B(fi, K_H, W, s_u, k_E, s_WL, k_WL, L_WL, D):
+    b_u = v.b_u(W)
+    K_WL = v.K_WL(s_WL, k_WL, b_u, s_u, k_E)
+    B_G = v.B_G3(K_WL, W)
+    n_G = v.n_G3(K_WL, W)
+
+    # a heat diffusion device narrower than W scales the limit curve with a_WL
+    a_WL, a_0 = a_WL_full(K_WL, W, D)
+    scale = np.where(L_WL < W, v.q_G3(v.a_WL1(a_WL, a_0, L_WL, W), a_WL, 1.0), 1.0)
+    q_G, deltat_H_G = _limit(fi, scale * B_G, n_G, K_H)
+    return B_G, n_G, np.ones(K_H.shape), scale, q_G, deltat_H_G
+
+
+def limits_D(fi, K_H):
+    B_G = np.full(K_H.shape, B_G_MAX)
+    n_G = np.zeros(K_H.shape)
+    q_G, deltat_H_G = _limit(fi, B_G, n_G, K_H)
+    return B_G, n_G, np.ones(K_H.shape), np.ones(K_H.shape), q_G, deltat_H_G
+
+
+def limit_curves(batch, t_F_max=DEFAULT_T_F_MAX):
+    """Limit curves of every design in an EmbeddedRadiantSystemBatch.
+
+    The limits use the floor K_H at the design covering and the maximum floor
+    surface temperature t_F_max (scalar or one per design).
+    """
+    n = batch.system_type.size
+    fi = np.broadcast_to(v.fi(np.asarray(t_F_max, dtype=float), batch.t_i), n)
+    K_H = calc_K_H(
+        batch.K_H_Floor, batch.K_H_Floor_star, batch.R_k_B, batch.floor_alfa, batch.floor_alfa
+    )
+    results = [np.full(n, np.nan) for _ in range(6)]
+
+    columns = batch.columns()
+    for types in ("ACHIJ", "B", "D"):
+        index = np.flatnonzero(np.isin(batch.system_type, list(types)))
+        if not index.size:
+            continue
+        c = {name: values[index] for name, values in columns.items()}
+        if types == "ACHIJ":
+            group = limits_ACHIJ(
+                fi[index], K_H[index], c["W"], c["s_u"], c["k_E"], c["psi"], c["k_W"]
+            )
+        elif types == "B":
+            D = np.maximum(c["external_diameter"], c["d_M"])
+            group = limits_B(
+                fi[index], K_H[index], c["W"], c["s_u"], c["k_E"],
+                c["s_WL"], c["k_WL"], c["L_WL"], D,
+            )
+        else:
+            group = limits_D(fi[index], K_H[index])
+        for result, values in zip(results, group):
+            result[index] = values
+
+    B_G, n_G, f_G, scale, q_G, deltat_H_G = results
+    return LimitCurves(
+        fi=np.array(fi),
+        B_G=B_G,
+        n_G=n_G,
+        f_G=f_G,
+        scale=scale,
+        q_G=q_G,
+        deltat_H_G=deltat_H_G,
+        exceeds=batch.deltat_H > deltat_H_G,
+    )
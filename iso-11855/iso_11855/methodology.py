@@ -1,8 +1,13 @@
 from . import functions as f
-from dataclasses import dataclass, field
+from .gradients import GRADIENT_INPUTS, gradients
+from .tables import on_reload
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+import threading
+import numpy as np
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EmbeddedPipe:
     name: str = "Default"
     external_diameter: float = 0.016 # External diameter of pipe [m]
@@ -11,11 +16,199 @@ class EmbeddedPipe:
 
 default_embedded_pipe = EmbeddedPipe()
 
-@dataclass
+# Inputs grouped by the results they feed: floor inputs -> K_H_Floor, K_H_Floor_star
+# and B; these plus the K_H inputs -> K_H; temperature inputs -> deltat_H; all -> q.
+FLOOR_INPUTS = (
+    "system_type", "embedded_pipe", "W", "d_M", "k_M", "s_WL", "k_WL", "L_WL",
+    "s_u", "k_E", "psi", "k_W",
+)
+K_H_INPUTS = ("case_of_application", "R_k_B")
+TEMPERATURE_INPUTS = ("t_i", "t_V", "t_R")
+
+# Floor values of recently evaluated constructions, shared between instances.
+FLOOR_CACHE_SIZE = 1024
+_floor_cache = OrderedDict()
+_floor_cache_lock = threading.Lock()
+
+# Persistent floor values consulted after _floor_cache, see cache.enable().
+DISK_CACHE = None
+
+
+@on_reload
+def _clear_floor_cache():
+    with _floor_cache_lock:
+        _floor_cache.clear()
+    if DISK_CACHE is not None:
+        DISK_CACHE.check_version()  # empties a disk cache stamped with older tables
+
+
+def B_0(system_type):
+    if system_type in "ACHIJ":
+        return 6.7
+    elif system_type in "BD":
+        return 6.5
+    else:
+        raise ValueError(f"There is no B_0 for system type: {system_type}")
+
+
+def K_H_ACHIJ(system, R_k_b):
+    """Floor heat transfer coefficient and B for system types A, C, H, I, J."""
+
+    if 0.05 <= system.psi <= 0.15:
+        k_E = f.k_E_prim(system.psi, system.k_E, system.k_W)
+    else:
+        k_E = system.k_E
+
+    a_B = f.a_B1(system.floor_alfa, k_E, R_k_b)
+    a_W = f.a_W1(R_k_b)
+    m_U = f.m_U(system.s_u)
+    m_D = f.m_D(system.D)
+
+    if system.W <= 0.375:
+        a_U = f.a_U1(R_k_b, system.W)
+        a_D = f.a_D(R_k_b, system.W)
+        m_W = f.m_W(system.W)
+
+        a_i = [a_B, a_W, a_U, a_D]
+        m_i = [1, m_W, m_U, m_D]
+
+        B = f.B1(
+            B_0=system.B_0,
+            a_i=a_i,
+            m_i=m_i,
+            W=system.W,
+            k_R=system.embedded_pipe.conductivity,
+            d_a=system.embedded_pipe.external_diameter,
+            s_R=system.embedded_pipe.wall_thickness,
+        )
+        return f.q5(B, a_i, m_i, 1), B
+
+    else:
+        a_U = f.a_U1(R_k_b, W=0.375)
+        a_D = f.a_D(R_k_b, W=0.375)
+        m_W = f.m_W(W=0.375)
+
+        a_i = [a_B, a_W, a_U, a_D]
+        m_i = [1, m_W, m_U, m_D]
+
+        B = f.B1(
+            B_0=system.B_0,
+            a_i=a_i,
+            m_i=m_i,
+            W=0.375,
+            k_R=system.embedded_pipe.conductivity,
+            d_a=system.embedded_pipe.external_diameter,
+            s_R=system.embedded_pipe.wall_thickness,
+        )
+        q_0375 = f.q5(B, a_i, m_i, 1)
+
+        return f.q8(q_0375, system.W), B
+
+
+def K_H_B(system, R_k_b):
+    """Floor heat transfer coefficient and B for system type B."""
+    a_U = f.a_U2(system.floor_alfa, system.s_u, system.k_E)
+    a_W = f.a_W2(system.s_u, system.k_E)
+    b_u = f.b_u(system.W)
+    a_K = f.a_K(system.W)
+    K_WL = f.K_WL(system.s_WL, system.k_WL, b_u, system.s_u, system.k_E)
+
+    if 0.05 <= system.W <= 0.45:
+        m_W = f.m_W(R_k_b)
+    else:
+        raise ValueError(f"Pipe spacing W = {system.W} m is outside 0.05 - 0.45 m")
+
+    a_0 = f.a_WL2(0, system.W, system.D)
+    if K_WL < 0.5:
+        a_WL = f.a_WL2(K_WL, system.W, system.D)
+    else:
+        a_WL = f.a_WL3(K_WL, system.W, system.D, a_0)
+
+    if system.L_WL < system.W:
+        a_WL = f.a_WL1(a_WL, a_0, system.L_WL, system.W)
+
+    a_B = f.a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_b, system.W)
+
+    a_i = [a_B, a_W, a_U, a_WL, a_K]
+    m_i = [1, m_W, 1, 1, 1]
+
+    B = f.B1(
+        B_0=system.B_0,
+        a_i=a_i,
+        m_i=m_i,
+        W=system.W,
+        k_R=system.embedded_pipe.conductivity,
+        d_a=system.embedded_pipe.external_diameter,
+        s_R=system.embedded_pipe.wall_thickness,
+    )
+
+    return f.q5(B, a_i, m_i, 1), B
+
+
+def K_H_D(system, R_k_b):
+    """Floor heat transfer coefficient and B for system type D."""
+    a_U = f.a_U2(system.floor_alfa, system.s_u, system.k_E)
+    a_B = f.a_B3(a_U, R_k_b)
+
+    a_i = [a_B, 1.06, a_U]
+    m_i = [1, 1, 1]
+
+    B = system.B_0
+
+    return f.q5(B, a_i, m_i, 1), B
+
+
+def calc_K_H_floor(system, R_k_b):
+    if system.system_type in "ACHIJ":
+        return K_H_ACHIJ(system, R_k_b)
+    elif system.system_type == "B":
+        return K_H_B(system, R_k_b)
+    elif system.system_type == "D":
+        return K_H_D(system, R_k_b)
+    else:
+        raise ValueError(f"There is no q system type: {system.system_type}")
+
+
+def floor_values(system):
+    """K_H_Floor, K_H_Floor_star and B, reused for constructions seen before."""
+    key = system.floor_key()
+    with _floor_cache_lock:
+        if key in _floor_cache:
+            _floor_cache.move_to_end(key)
+            return _floor_cache[key]
+
+    disk_cache = DISK_CACHE
+    if disk_cache is not None:
+        from .cache import floor_key  # cache builds on this module
+
+        disk_key = floor_key(system)
+        values = disk_cache.get(disk_key)
+    if disk_cache is None or values is None:
+        K_H_Floor, _ = calc_K_H_floor(system, R_k_b=0)
+        K_H_Floor_star, B = calc_K_H_floor(system, R_k_b=0.15)
+        # plain floats, as read back from the disk cache
+        values = (float(K_H_Floor), float(K_H_Floor_star), float(B))
+        if disk_cache is not None:
+            disk_cache.put(disk_key, values)
+
+    with _floor_cache_lock:
+        _floor_cache[key] = values
+        if len(_floor_cache) > FLOOR_CACHE_SIZE:
+            _floor_cache.popitem(last=False)
+    return values
+
+
+def calc_K_H(K_H_Floor, K_H_Floor_star, R_k_B, alfa, floor_alfa):
+    R_k_b_star = 0.15
+    deltaR_alfa = 1/alfa - 1/floor_alfa
+    return f.K_H2(K_H_Floor, deltaR_alfa, R_k_B, K_H_Floor_star, R_k_b_star)
+
+
+@dataclass(frozen=True, slots=True)
 class EmbeddedRadiantSystem:
     name: str = 'Default'
     system_type: str = 'A' # System type (A, B, C, D, H, I, J)
-    embedded_pipe: EmbeddedPipe = field(default_factory=default_embedded_pipe)
+    embedded_pipe: EmbeddedPipe = default_embedded_pipe
     case_of_application: str = 'floor heating'
     W: float = 0.10 # Pipe spacing [m]
 
@@ -32,7 +225,7 @@ class EmbeddedRadiantSystem:
     s_u: float = 0.045  # Thickness of layer above the pipe [m]
     R_k_B: float = 0.05  # Thermal resistance of the floor covering [m2K/W]
     k_E: float = 1.8  # Thermal conductivity of screed [W/mK]
-    
+
     # fixing inserts
     psi: float = 0.05  # Volume ratio of the fixing inserts in the screed
     k_W: float = 0.5  # Thermal conductivity of the fixing inserts [W/mK]
@@ -42,142 +235,97 @@ class EmbeddedRadiantSystem:
     t_V: float = 40.0  # Design supply temperature of heating or cooling medium [*C]
     t_R: float = 35.0  # Design return temperature of heating or cooling medium [*C]
 
-    deltat_H: float = field(init=False)  # Medium differential temperature [K]
-    q: float = field(init=False)  # Heat flux [W/m2]
-    K_H: float = field(init=False)  # Equivalent heat transmission coefficient.
-
-    def B_0(self):
-        if self.system_type in "ACHIJ":
-            return 6.7
-        elif self.system_type in "BD":
-            return 6.5
-        else:
-            return "There is no B_0 for system type: ", self.system_type
-
-    def K_H_ACHIJ(self, R_k_b):
-        """Heat transfer coefficient for system types A, C, H, I, J."""
-
-        if 0.05 <= self.psi <= 0.15:
-            k_E = f.k_E_prim(self.psi, self.k_E, self.k_W)
-        else:
-            k_E = self.k_E
-
-        a_B = f.a_B1(self.floor_alfa, k_E, R_k_b)
-        a_W = f.a_W1(R_k_b)
-        m_U = f.m_U(self.s_u)
-        m_D = f.m_D(self.D)
-
-        if self.W <= 0.375:
-            a_U = f.a_U1(R_k_b, self.W)
-            a_D = f.a_D(R_k_b, self.W)
-            m_W = f.m_W(self.W)
-
-            a_i = [a_B, a_W, a_U, a_D]
-            m_i = [1, m_W, m_U, m_D]
-
-            self.B = f.B1(
-                B_0=self.B_0,
-                a_i=a_i,
-                m_i=m_i,
-                W=self.W,
-                k_R=self.embedded_pipe.conductivity,
-                d_a=self.embedded_pipe.external_diameter,
-                s_R=self.embedded_pipe.wall_thickness,
-            )
-            return f.q5(self.B, a_i, m_i, 1)
-
-        else:
-            a_U = f.a_U1(R_k_b, W=0.375)
-            a_D = f.a_D(R_k_b, W=0.375)
-            m_W = f.m_W(W=0.375)
-
-            a_i = [a_B, a_W, a_U, a_D]
-            m_i = [1, m_W, m_U, m_D]
-
-            self.B = f.B1(
-                B_0=self.B_0,
-                a_i=a_i,
-                m_i=m_i,
-                W=0.375,
-                k_R=self.embedded_pipe.conductivity,
-                d_a=self.embedded_pipe.external_diameter,
-                s_R=self.embedded_pipe.wall_thickness,
-            )
-            q_0375 = f.q5(self.B, a_i, m_i, 1)
-
-            return f.q8(q_0375, self.W)
-
-    def K_H_B(self, R_k_b):
-        """Heat transfer coefficient for system type B."""
-        a_U = f.a_U2(self.floor_alfa, self.s_u, self.k_E)
-        a_W = f.a_W2(self.s_u, self.k_E)
-        b_u = f.b_u(self.W)
-        a_K = f.a_K(self.W)
-        K_WL = f.K_WL(self.s_WL, self.k_WL, b_u, self.s_u, self.k_E)
-
-        if 0.05 <= self.W <= 0.45:
-            m_W = f.m_W(R_k_b)
-        
-        if K_WL < 0.5:
-            a_WL = f.a_WL2(K_WL, self.W, self.D)
-        else:
-            a_WL = f.a_WL3(K_WL, self.W, self.D)
-
-        if self.L_WL < self.W:
-            a_0 = f.a_WL2(0, self.W, self.D)
-            a_WL = f.a_WL1(a_WL, a_0, self.L_WL, self.W)
-
-        a_B = f.a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_b, self.W)
-
-        a_i = [a_B, a_W, a_U, a_WL, a_K]
-        m_i = [1, m_W, 1, 1, 1]
-
-        self.B = f.B1(
-            B_0=self.B_0,
-            a_i=a_i,
-            m_i=m_i,
-            W=self.W,
-            k_R=self.embedded_pipe.conductivity,
-            d_a=self.embedded_pipe.external_diameter,
-            s_R=self.embedded_pipe.wall_thickness,
+    # results, derived from the inputs and left out of comparison and hashing
+    B_0: float = field(init=False, compare=False)  # Base coefficient of the system type
+    floor_alfa: float = field(init=False, compare=False)  # alfa of floor heating [W/m2K]
+    alfa: float = field(init=False, compare=False)  # Heat transfer coefficient [W/m2K]
+    D: float = field(init=False, compare=False)  # Pipe diameter including sheathing [m]
+    B: float = field(init=False, compare=False)  # System dependent coefficient [W/m2K]
+    deltat_H: float = field(init=False, compare=False)  # Medium differential temperature [K]
+    q: float = field(init=False, compare=False)  # Heat flux [W/m2]
+    K_H: float = field(init=False, compare=False)  # Equivalent heat transmission coefficient.
+    K_H_Floor: float = field(init=False, compare=False)  # Floor K_H at R_k_b = 0
+    K_H_Floor_star: float = field(init=False, compare=False)  # Floor K_H at R_k_b_star = 0.15
+
+    def floor_key(self):
+        pipe = self.embedded_pipe
+        return tuple(getattr(self, name) for name in FLOOR_INPUTS if name != "embedded_pipe") + (
+            pipe.external_diameter, pipe.wall_thickness, pipe.conductivity, f.A_WL2_METHOD,
+            f.FAST_KERNELS,
         )
 
-        return f.q5(self.B, a_i, m_i, 1)
-
-    def K_H_D(self, R_k_b):
-        """Heat transfer coefficient for system type D."""
-        a_U = f.a_U2(self.floor_alfa, self.s_u, self.k_E)
-        a_B = f.a_B3(a_U, R_k_b)
-
-        a_i = [a_B, 1.06, a_U]
-        m_i = [1, 1, 1]
-
-        self.B = self.B_0
-
-        return f.q5(self.B, a_i, m_i, 1)
-
-    def calc_K_H_floor(self, R_k_b):
-        if self.system_type in "ACHIJ":
-            return self.K_H_ACHIJ(R_k_b)
-        elif self.system_type == "B":
-            return self.K_H_B(R_k_b)
-        elif self.system_type == "D":
-            return self.K_H_D(R_k_b)
-        else:
-            return "There is no q system type: ", self.system_type
-    
-    def calc_K_H(self):
-        K_H_Floor = self.calc_K_H_floor(R_k_b=0)
-        R_k_b_star = 0.15
-        K_H_Floor_star = self.calc_K_H_floor(R_k_b_star)
-        deltaR_alfa = 1/self.alfa - 1/self.floor_alfa
-        return f.K_H2(K_H_Floor, deltaR_alfa, self.R_k_B, K_H_Floor_star, R_k_b_star)
+    def calc_K_H(self, alfa=None, R_k_B=None):
+        """K_H from the floor values, for this or another alfa and covering."""
+        alfa = self.alfa if alfa is None else alfa
+        R_k_B = self.R_k_B if R_k_B is None else R_k_B
+        return calc_K_H(self.K_H_Floor, self.K_H_Floor_star, R_k_B, alfa, self.floor_alfa)
+
+    def cases_of_application(self):
+        """K_H and q for every case of application, reusing the floor values."""
+        cases = {}
+        for case, alfa in f.ALFA_SWITCHER.items():
+            K_H = self.calc_K_H(alfa)
+            cases[case] = {"K_H": K_H, "q": K_H * self.deltat_H}
+        return cases
+
+    def covering_sweep(self, R_k_B):
+        """K_H and q for an array of floor covering resistances R_k_B [m2K/W]."""
+        R_k_B = np.asarray(R_k_B, dtype=float)
+        K_H = self.calc_K_H(R_k_B=R_k_B)
+        return {"R_k_B": R_k_B, "K_H": K_H, "q": K_H * self.deltat_H}
+
+    def supply_temperature(self, q, sigma=5.0):
+        """Supply temperature delivering heat flux q with t_V - t_R = sigma."""
+        # with K_H > 0, deltat_H = q / K_H has the sign of q
+        if self.K_H <= 0 or q == 0 or q * sigma < 0:
+            raise ValueError(
+                f"No supply temperature delivers q = {q} W/m2 with t_V - t_R = {sigma} K"
+            )
+        deltat_H = q / self.K_H
+        return f.t_V(deltat_H, self.t_i, sigma)
+
+    def gradients(self, inputs=GRADIENT_INPUTS):
+        """K_H and q with their exact partial derivatives, see gradients.gradients()."""
+        return gradients(self, inputs)
+
+    def uncertainty(self, distributions, **options):
+        """Monte Carlo statistics of q, t_S_m and the limit margin, see uncertainty.propagate()."""
+        from .uncertainty import propagate  # uncertainty builds on batch, which imports this module
+
+        return propagate(self, distributions, **options)
+
+    def replace(self, **changes):
+        """Copy with changed inputs; only the results depending on them are recomputed."""
+        unknown = set(changes) - set(FLOOR_INPUTS + K_H_INPUTS + TEMPERATURE_INPUTS + ("name",))
+        if unknown:
+            raise TypeError(f"Unknown inputs: {sorted(unknown)}")
+        system = object.__new__(type(self))
+        for fld in fields(self):
+            object.__setattr__(system, fld.name, changes.get(fld.name, getattr(self, fld.name)))
+        system._evaluate(changes)
+        return system
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def _evaluate(self, changed):
+        """Fill in the results depending on the `changed` inputs while constructing."""
+        changed = set(changed)
+        if changed & set(FLOOR_INPUTS):
+            self._set(
+                B_0=B_0(self.system_type),
+                floor_alfa=f.alfa("floor heating"),
+                D=max(self.embedded_pipe.external_diameter, self.d_M),
+            )
+            K_H_Floor, K_H_Floor_star, B = floor_values(self)
+            self._set(K_H_Floor=K_H_Floor, K_H_Floor_star=K_H_Floor_star, B=B)
+        if changed & set(FLOOR_INPUTS + K_H_INPUTS):
+            self._set(alfa=f.alfa(self.case_of_application))
+            self._set(K_H=self.calc_K_H())
+        if changed & set(TEMPERATURE_INPUTS):
+            self._set(deltat_H=f.deltat_H(self.t_V, self.t_R, self.t_i))
+        self._set(q=self.K_H * self.deltat_H)
 
     def __post_init__(self) -> None:
-        self.B_0 = self.B_0()
-        self.floor_alfa = f.alfa("floor heating")
-        self.alfa = f.alfa(self.case_of_application)
-        self.D = max(self.embedded_pipe.external_diameter, self.d_M)
-        self.K_H = self.calc_K_H()
-        self.deltat_H = f.deltat_H(self.t_V, self.t_R, self.t_i)
-        self.q = self.K_H * self.deltat_H
+        self._evaluate(FLOOR_INPUTS + K_H_INPUTS + TEMPERATURE_INPUTS)
@@ -0,0 +1,168 @@
+"""Design of a whole project of rooms on one construction, after EN 1264-3.
+
+All rooms share the supply temperature. It is set by the worst-case room,
+the one needing the highest supply temperature at the design spacing
+W_design and the design spread sigma. Every other room then gets the widest
+standard spacing that still delivers its heat flux at that spread, and the
+spread that delivers exactly its heat flux. K_H does not depend on the
+temperatures, so one batch evaluation of every room at every standard
+spacing gives all the results.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+
+from . import vectorized as v
+from .batch import INPUT_COLUMNS, PIPE_COLUMNS, EmbeddedRadiantSystemBatch
+from .limits import DEFAULT_T_F_MAX, limit_curves
+from .methodology import EmbeddedRadiantSystem
+from .solvers import supply_temperature
+
+# Pipe spacings offered for the rooms [m]
+STANDARD_SPACINGS = (0.05, 0.075, 0.1, 0.125, 0.15, 0.2, 0.25, 0.3)
+
+
+@dataclass(frozen=True, slots=True)
+class Room:
+    name: str
+    area: float  # Floor area [m2]
+    heat_load: float  # Design heat load covered by the surface [W]
+    R_k_B: float = 0.10  # Thermal resistance of the floor covering [m2K/W]
+    t_i: float = 20.0  # Design indoor temperature [*C]
+    usable_area: Optional[float] = None  # Surface with pipes [m2], the floor area if None
+
+    @property
+    def q_des(self):
+        """Design heat flux [W/m2]."""
+        return self.heat_load / (self.area if self.usable_area is None else self.usable_area)
+
+
+@dataclass
+class ProjectDesign:
+    names: tuple  # Room names
+    q_des: np.ndarray  # Design heat flux [W/m2]
+    W: np.ndarray  # Pipe spacing [m]
+    K_H: np.ndarray  # Equivalent heat transmission coefficient [W/m2K]
+    t_V: float  # Common design supply temperature [*C]
+    t_R: np.ndarray  # Design return temperature [*C], NaN where infeasible
+    sigma: np.ndarray  # Spread t_V - t_R [K], NaN where infeasible
+    deltat_H: np.ndarray  # Medium differential temperature [K]
+    worst: Optional[int]  # Index of the worst-case room, None if no room is feasible
+    feasible: np.ndarray  # False where no spacing and spread deliver q_des at t_V
+    q_G: np.ndarray  # Limiting heat flux [W/m2], NaN where infeasible
+    exceeds: np.ndarray  # Floor too hot at the design, see limits.limit_curves()
+
+    def check(self):
+        """Raise ValueError if any room has no solution."""
+        infeasible = np.flatnonzero(~self.feasible)
+        if infeasible.size:
+            names = [self.names[i] for i in infeasible[:10]]
+            raise ValueError(
+                f"No design delivers the heat flux of {infeasible.size} room(s): {names}"
+            )
+        return self
+
+
+@dataclass
+class Project:
+    rooms: list  # Room instances
+    system: EmbeddedRadiantSystem = field(default_factory=EmbeddedRadiantSystem)  # Construction
+    W_design: float = 0.10  # Pipe spacing of the worst-case room [m]
+    sigma: float = 5.0  # Design spread t_V - t_R of the worst-case room [K]
+    spacings: tuple = STANDARD_SPACINGS
+    t_F_max: float = DEFAULT_T_F_MAX  # Maximum floor surface temperature [*C]
+
+    def columns(self):
+        """Inputs of the rooms as batch columns: the construction, then R_k_B and t_i per room."""
+        n = len(self.rooms)
+        system, pipe = self.system, self.system.embedded_pipe
+        columns = {
+            name: getattr(pipe if name in PIPE_COLUMNS else system, name) for name in INPUT_COLUMNS
+        }
+        columns.update(
+            R_k_B=np.array([room.R_k_B for room in self.rooms], dtype=float),
+            t_i=np.array([room.t_i for room in self.rooms], dtype=float),
+        )
+        return {name: np.broadcast_to(value, n) for name, value in columns.items()}
+
+    def design(self):
+        """Supply temperature, spacings and spreads of all rooms, see ProjectDesign."""
+        columns = self.columns()
+        n = len(self.rooms)
+        q_des = np.array([room.q_des for room in self.rooms], dtype=float)
+        t_i = columns["t_i"]
+        spacings = np.union1d(self.spacings, [self.W_design])
+        j_design = int(np.searchsorted(spacings, self.W_design))
+
+        # K_H of every room at every spacing, (rooms, spacings)
+        grid = {name: np.repeat(values, spacings.size) for name, values in columns.items()}
+        grid["W"] = np.tile(spacings, n)
+        K_H = EmbeddedRadiantSystemBatch.from_columns(grid).K_H.reshape(n, spacings.size)
+
+        # the worst-case room needs the highest supply temperature at W_design
+        required = supply_temperature(q_des, K_H[:, j_design], t_i, self.sigma).t_V
+        if np.isnan(required).all():
+            return self._infeasible(q_des, K_H[:, j_design])
+        worst = int(np.nanargmax(required))
+        t_V = float(required[worst])
+
+        # widest spacing delivering q_des at the design spread; never below W_design
+        deltat_H_design = v.deltat_H(t_V, t_V - self.sigma, t_i)
+        meets = K_H * deltat_H_design[:, None] >= q_des[:, None]
+        meets[:, :j_design] = False
+        meets[:, j_design] |= ~meets.any(axis=1)
+        j = spacings.size - 1 - np.argmax(meets[:, ::-1], axis=1)
+        if self.system.system_type == "D":
+            j[:] = j_design  # no pipe spacing; K_H does not depend on W
+        j[worst] = j_design
+        W = spacings[j]
+        K_H = K_H[np.arange(n), j]
+
+        # spread delivering exactly q_des at t_V
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deltat_H = q_des / K_H
+        sigma = v.sigma(deltat_H, t_V, t_i)
+        sigma[worst] = self.sigma
+        feasible = np.isfinite(sigma) & (q_des > 0)
+
+        # limit curves of the feasible rooms only; the others have no t_R
+        design = dict(columns, W=W, t_V=np.full(n, t_V), t_R=t_V - sigma)
+        design = {name: values[feasible] for name, values in design.items()}
+        q_G, exceeds = np.full(n, np.nan), np.zeros(n, dtype=bool)
+        if feasible.any():
+            limits = limit_curves(EmbeddedRadiantSystemBatch.from_columns(design), self.t_F_max)
+            q_G[feasible], exceeds[feasible] = limits.q_G, limits.exceeds
+        return ProjectDesign(
+            names=tuple(room.name for room in self.rooms),
+            q_des=q_des,
+            W=W,
+            K_H=K_H,
+            t_V=t_V,
+            t_R=np.where(feasible, t_V - sigma, np.nan),
+            sigma=np.where(feasible, sigma, np.nan),
+            deltat_H=deltat_H,
+            worst=worst,
+            feasible=feasible,
+            q_G=q_G,
+            exceeds=exceeds,
+        )
+
+    def _infeasible(self, q_des, K_H):
+        # no room has a supply temperature at W_design, so neither has the project
+        n = len(self.rooms)
+        nan = np.full(n, np.nan)
+        return ProjectDesign(
+            names=tuple(room.name for room in self.rooms),
+            q_des=q_des,
+            W=np.full(n, self.W_design),
+            K_H=K_H,
+            t_V=np.nan,
+            t_R=nan,
+            sigma=nan,
+            deltat_H=nan,
+            worst=None,
+            feasible=np.zeros(n, dtype=bool),
+            q_G=nan,
+            exceeds=np.zeros(n, dtype=bool),
+        )
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+import numpy as np
+
+from . import vectorized as v
+from .batch import EmbeddedRadiantSystemBatch, broadcast_columns
+
+# Spacings of the Annex A tables; the ISO 11855 regimes change only at these points.
+TABLE_SPACINGS = (0.05, 0.075, 0.1, 0.15, 0.2, 0.225, 0.3, 0.375, 0.45)
+
+
+@dataclass
+class SupplyTemperature:
+    t_V: np.ndarray  # Design supply temperature [*C], NaN where infeasible
+    t_R: np.ndarray  # Design return temperature [*C], NaN where infeasible
+    deltat_H: np.ndarray  # Required medium differential temperature [K]
+    feasible: np.ndarray  # False where no supply temperature delivers q
+
+    def check(self):
+        """Raise ValueError if any design has no solution."""
+        infeasible = np.flatnonzero(~self.feasible)
+        if infeasible.size:
+            raise ValueError(
+                f"No supply temperature delivers the target heat flux for "
+                f"{infeasible.size} design(s), e.g. at index {infeasible[:10].tolist()}"
+            )
+        return self
+
+
+def supply_temperature(q, K_H, t_i, sigma):
+    """Supply temperature delivering heat flux q with the spread sigma = t_V - t_R.
+
+    K_H comes from an EmbeddedRadiantSystem or its batch counterpart, so the
+    heat flux follows its sign convention (negative for cooling, together with
+    a negative sigma). Inputs broadcast; designs without a solution (K_H not
+    positive, q of zero or of the opposite sign to sigma) get NaN temperatures
+    and feasible=False.
+    """
+    q, K_H, t_i, sigma = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (q, K_H, t_i, sigma))
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deltat_H = q / K_H
+        feasible = (
+            (K_H > 0)
+            & np.isfinite(deltat_H)
+            & (deltat_H != 0)
+            & (deltat_H * sigma >= 0)
+            & np.isfinite(t_i)
+            & np.isfinite(sigma)
+        )
+        t_V = np.where(feasible, v.t_V(deltat_H, t_i, sigma), np.nan)
+    return SupplyTemperature(t_V=t_V, t_R=t_V - sigma, deltat_H=deltat_H, feasible=feasible)
+
+
+@dataclass
+class PipeSpacing:
+    W: np.ndarray  # Largest pipe spacing meeting the target [m], NaN where infeasible
+    q: np.ndarray  # Heat flux at W [W/m2]
+    feasible: np.ndarray  # False where even W_min misses the target
+
+    def check(self):
+        """Raise ValueError if any design has no solution."""
+        infeasible = np.flatnonzero(~self.feasible)
+        if infeasible.size:
+            raise ValueError(
+                f"No pipe spacing delivers the target heat flux for "
+                f"{infeasible.size} design(s), e.g. at index {infeasible[:10].tolist()}"
+            )
+        return self
+
+
+def _heat_flux(columns, W):
+    return EmbeddedRadiantSystemBatch.from_columns({**columns, "W": W}).q
+
+
+def pipe_spacing(columns, q, W_min=0.05, W_max=0.45, step=0.025, tol=1e-5):
+    """Largest pipe spacing W in [W_min, W_max] delivering at least heat flux q.
+
+    For cooling, q and the heat fluxes of the rooms are negative and "at
+    least" means at least |q| of cooling.
+
+    `columns` describe the rooms as for EmbeddedRadiantSystemBatch.from_columns
+    (their W is ignored) with fixed t_V, t_R and t_i. All rooms are bracketed
+    together on the table spacings refined to `step`, then the brackets are
+    bisected in batched evaluations down to `tol`. The returned W always meets
+    the target; system type D has no pipe spacing and is reported infeasible.
+    """
+    columns = broadcast_columns(columns)
+    n = columns["system_type"].size
+    q = np.broadcast_to(np.asarray(q, dtype=float), n)
+
+    spacings = np.union1d(
+        np.arange(W_min, W_max, step),
+        [W for W in TABLE_SPACINGS if W_min < W < W_max] + [W_min, W_max],
+    )
+    repeated = {name: np.repeat(values, spacings.size) for name, values in columns.items()}
+    q_grid = _heat_flux(repeated, np.tile(spacings, n)).reshape(n, spacings.size)
+
+    # "at least q" in magnitude, in the direction of q (negative for cooling)
+    direction = np.sign(q)
+    meets = q_grid * direction[:, None] >= np.abs(q)[:, None]
+    # index of the last bracketing spacing that still meets the target
+    last = spacings.size - 1 - np.argmax(meets[:, ::-1], axis=1)
+    feasible = meets.any(axis=1) & (columns["system_type"] != "D")
+    W = np.where(feasible, spacings[last], np.nan)
+    q_W = q_grid[np.arange(n), last]
+
+    active = np.flatnonzero(feasible & (last < spacings.size - 1))
+    lo = spacings[last[active]]
+    hi = spacings[last[active] + 1]
+    q_lo = q_W[active]
+    subset = {name: values[active] for name, values in columns.items()}
+    while active.size and np.max(hi - lo) > tol:
+        mid = 0.5 * (lo + hi)
+        q_mid = _heat_flux(subset, mid)
+        up = q_mid * direction[active] >= np.abs(q[active])
+        lo = np.where(up, mid, lo)
+        q_lo = np.where(up, q_mid, q_lo)
+        hi = np.where(up, hi, mid)
+    W[active] = lo
+    q_W[active] = q_lo
+    return PipeSpacing(W=W, q=np.where(feasible, q_W, np.nan), feasible=feasible)
@@ -0,0 +1,187 @@
+"""SQLite store of design results, also usable as a persistent cache.
+
+One row per design: the inputs of INPUT_COLUMNS, the maximum floor surface
+temperature t_F_max of the limit curves and the results K_H, B, deltat_H,
+q, q_G, deltat_H_G and exceeds. The inputs with t_F_max are unique, so a
+design is stored, and evaluated by ResultStore.evaluate(), only once; they
+must not be NaN.
+"""
+
+import sqlite3
+import numpy as np
+
+from .batch import INPUT_COLUMNS, RESULT_COLUMNS, TEXT_COLUMNS, broadcast_columns
+from .limits import DEFAULT_T_F_MAX
+from .sweep import DEFAULT_CHUNK_SIZE, LIMIT_COLUMNS, sweep
+
+SCHEMA_VERSION = 1
+KEY_COLUMNS = (*INPUT_COLUMNS, "t_F_max")
+OUTPUT_COLUMNS = (*RESULT_COLUMNS, *LIMIT_COLUMNS)
+COLUMNS = (*KEY_COLUMNS, *OUTPUT_COLUMNS)
+INDEXED_COLUMNS = ("system_type", "W", "s_u", "R_k_B", "q", "t_V")
+
+
+def _type(name):
+    if name in TEXT_COLUMNS:
+        return "TEXT"
+    return "INTEGER" if name == "exceeds" else "REAL"
+
+
+def _array(name, values):
+    if name in TEXT_COLUMNS:
+        return np.array(values, dtype=str)
+    # NULL, stored for NaN, comes back as None and becomes NaN again
+    values = np.array(values, dtype=float)
+    return values.astype(bool) if name == "exceeds" else values
+
+
+def _check_keys(columns):
+    # NaN is stored as NULL, which equals nothing: such a design would be
+    # stored again every time and never found
+    nan = [
+        name
+        for name in KEY_COLUMNS
+        if name not in TEXT_COLUMNS and np.isnan(np.asarray(columns[name], dtype=float)).any()
+    ]
+    if nan:
+        raise ValueError(f"The design inputs must not be NaN, found NaN in: {nan}")
+
+
+def _rows(columns, names):
+    return zip(*(np.asarray(columns[name]).tolist() for name in names))
+
+
+class ResultStore:
+    """Design results in the SQLite database `path` (":memory:" for a private one)."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS designs ("
+                + ", ".join(f"{name} {_type(name)}" for name in COLUMNS)
+                + f", UNIQUE ({', '.join(KEY_COLUMNS)}))"
+            )
+            for name in INDEXED_COLUMNS:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS designs_{name} ON designs ({name})"
+                )
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM designs").fetchone()[0]
+
+    def append(self, table, t_F_max=DEFAULT_T_F_MAX):
+        """Add the rows of a sweep() table evaluated at t_F_max; known designs are skipped."""
+        columns = {**table, "t_F_max": np.broadcast_to(float(t_F_max), len(table["q"]))}
+        _check_keys(columns)
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO designs ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                _rows(columns, COLUMNS),
+            )
+
+    def query(self, columns=COLUMNS, **conditions):
+        """Stored designs as columns, filtered by `conditions`.
+
+        A condition is a value to match or a (low, high) range, either end
+        None for open, e.g. query(system_type="A", q=(80, None), t_V=(None, 35)).
+        """
+        unknown = (set(columns) | set(conditions)) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        where, parameters = [], []
+        for name, condition in conditions.items():
+            if isinstance(condition, (tuple, list)):
+                low, high = condition
+                if low is not None:
+                    where.append(f"{name} >= ?")
+                    parameters.append(low)
+                if high is not None:
+                    where.append(f"{name} <= ?")
+                    parameters.append(high)
+            else:
+                where.append(f"{name} = ?")
+                parameters.append(condition)
+        sql = f"SELECT {', '.join(columns)} FROM designs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self.connection.execute(sql, parameters).fetchall()
+        values = zip(*rows) if rows else [()] * len(columns)
+        return {name: _array(name, column) for name, column in zip(columns, values)}
+
+    def evaluate(
+        self,
+        samples,
+        t_F_max=DEFAULT_T_F_MAX,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        max_workers=None,
+        **fixed,
+    ):
+        """sweep() through the store: stored designs are read, only new ones evaluated.
+
+        Returns the same table as sweep(samples, t_F_max=t_F_max, **fixed)
+        and stores the new results.
+        """
+        unknown = (set(samples) | set(fixed)) - set(INPUT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+        columns = broadcast_columns({**fixed, **samples})
+        n = len(columns["W"])
+        columns["t_F_max"] = np.full(n, float(t_F_max))
+        _check_keys(columns)
+
+        # look the designs up by joining them as a temporary table
+        with self.connection:
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS request (row INTEGER, "
+                + ", ".join(f"{name} {_type(name)}" for name in KEY_COLUMNS)
+                + ")"
+            )
+            self.connection.execute("DELETE FROM request")
+            self.connection.executemany(
+                f"INSERT INTO request VALUES ({', '.join('?' * (len(KEY_COLUMNS) + 1))})",
+                zip(range(n), *(columns[name].tolist() for name in KEY_COLUMNS)),
+            )
+            rows = self.connection.execute(
+                f"SELECT request.row, {', '.join(f'designs.{name}' for name in OUTPUT_COLUMNS)} "
+                "FROM request JOIN designs ON "
+                + " AND ".join(f"designs.{name} = request.{name}" for name in KEY_COLUMNS)
+            ).fetchall()
+            self.connection.execute("DELETE FROM request")
+
+        found = np.zeros(n, dtype=bool)
+        outputs = {name: np.full(n, np.nan) for name in OUTPUT_COLUMNS}
+        outputs["exceeds"] = np.zeros(n, dtype=bool)
+        if rows:
+            index, *values = zip(*rows)
+            index = np.array(index)
+            found[index] = True
+            for name, column in zip(OUTPUT_COLUMNS, values):
+                outputs[name][index] = _array(name, column)
+
+        missing = np.flatnonzero(~found)
+        if missing.size:
+            table = sweep(
+                {name: columns[name][missing] for name in INPUT_COLUMNS},
+                chunk_size=chunk_size,
+                max_workers=max_workers,
+                t_F_max=t_F_max,
+            )
+            self.append(table, t_F_max)
+            for name in OUTPUT_COLUMNS:
+                outputs[name][missing] = table[name]
+        return {**{name: columns[name] for name in INPUT_COLUMNS}, **outputs}
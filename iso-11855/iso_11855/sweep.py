@@ -0,0 +1,285 @@
+from collections import deque
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from math import prod
+from pathlib import Path
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy.stats import qmc
+
+from . import functions as f
+from .batch import EmbeddedRadiantSystemBatch, INPUT_COLUMNS, RESULT_COLUMNS, TEXT_COLUMNS
+from .limits import limit_curves
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional (pip install pyarrow)
+    pa = pq = None
+
+DEFAULT_CHUNK_SIZE = 20_000
+LIMIT_COLUMNS = ("q_G", "deltat_H_G", "exceeds")
+COLUMNS = (*INPUT_COLUMNS, *RESULT_COLUMNS, *LIMIT_COLUMNS)  # Columns of evaluate_chunk()
+TEXT_DTYPE = "<U32"  # Fixed width of text columns in .npy output
+CHECKPOINT = "checkpoint.json"
+SETTINGS = ("FAST_KERNELS", "A_WL2_METHOD")  # Switches of functions.py passed to the workers
+
+
+def grid(**axes):
+    """Cartesian product of the given axes as columns; the last axis varies fastest."""
+    values = [np.asarray(axis) for axis in axes.values()]
+    mesh = np.meshgrid(*values, indexing="ij")
+    return {name: column.ravel() for name, column in zip(axes, mesh)}
+
+
+def grid_size(**axes):
+    return prod(len(axis) for axis in axes.values())
+
+
+def grid_chunks(chunk_size=DEFAULT_CHUNK_SIZE, start=0, **axes):
+    """grid() in chunks of `chunk_size` rows from row `start`, built lazily."""
+    values = [np.asarray(axis) for axis in axes.values()]
+    shape = tuple(len(axis) for axis in values)
+    n = prod(shape)
+    for begin in range(start, n, chunk_size):
+        index = np.unravel_index(np.arange(begin, min(begin + chunk_size, n)), shape)
+        yield {name: axis[i] for name, axis, i in zip(axes, values, index)}
+
+
+def latin_hypercube(n, seed=None, **ranges):
+    """`n` Latin-hypercube samples over the given (low, high) ranges as columns."""
+    sample = qmc.LatinHypercube(d=len(ranges), seed=seed).random(n)
+    low, high = np.array(list(ranges.values()), dtype=float).T
+    sample = qmc.scale(sample, low, high)
+    return {name: sample[:, i] for i, name in enumerate(ranges)}
+
+
+def evaluate_chunk(columns, t_F_max=None):
+    """Inputs and results of one chunk of designs as columns.
+
+    With a maximum floor surface temperature t_F_max the limit curve results
+    are added as well.
+    """
+    batch = EmbeddedRadiantSystemBatch.from_columns(columns)
+    results = {**batch.columns(), **batch.results()}
+    if t_F_max is not None:
+        limits = limit_curves(batch, t_F_max)
+        results.update({name: getattr(limits, name) for name in LIMIT_COLUMNS})
+    return results
+
+
+def _pool(max_workers):
+    # workers started by spawn import the defaults, so they get the settings of this process
+    settings = {name: getattr(f, name) for name in SETTINGS}
+    return ProcessPoolExecutor(max_workers, initializer=_apply, initargs=(settings,))
+
+
+def _apply(settings):
+    for name, value in settings.items():
+        setattr(f, name, value)
+
+
+def chunks(columns, chunk_size):
+    n = len(next(iter(columns.values())))
+    for start in range(0, n, chunk_size):
+        yield {name: values[start : start + chunk_size] for name, values in columns.items()}
+
+
+def sweep(samples, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None, t_F_max=None, **fixed):
+    """Evaluate every sampled design and return one columnar table.
+
+    `samples` maps input names to equally long columns (see grid() and
+    latin_hypercube()); `fixed` inputs apply to all designs and the rest
+    keep the EmbeddedRadiantSystem defaults. Chunks of `chunk_size` rows are
+    evaluated on a process pool of `max_workers` (all cores by default) and
+    the result rows keep the order of `samples`. Given t_F_max, the table
+    also holds the limit curve results q_G, deltat_H_G and exceeds.
+    """
+    unknown = (set(samples) | set(fixed)) - set(INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+
+    samples = {name: np.asarray(values) for name, values in samples.items()}
+    n = len(next(iter(samples.values())))
+    columns = {name: np.broadcast_to(value, n) for name, value in fixed.items()}
+    columns.update(samples)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    evaluate = partial(evaluate_chunk, t_F_max=t_F_max)
+    parts = list(chunks(columns, chunk_size))
+    if max_workers == 1 or len(parts) == 1:
+        results = [evaluate(part) for part in parts]
+    else:
+        with _pool(min(max_workers, len(parts))) as executor:
+            results = list(executor.map(evaluate, parts))
+
+    return {name: np.concatenate([part[name] for part in results]) for name in results[0]}
+
+
+def evaluate_chunks(parts, max_workers=None, t_F_max=None, **fixed):
+    """Evaluate an iterable of column chunks lazily, yielding results in order.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    however many chunks `parts` yields.
+    """
+    evaluate = partial(evaluate_chunk, t_F_max=t_F_max)
+
+    def complete(part):
+        n = len(next(iter(part.values())))
+        columns = {name: np.broadcast_to(value, n) for name, value in fixed.items()}
+        columns.update(part)
+        return columns
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for part in parts:
+            yield evaluate(complete(part))
+        return
+    with _pool(max_workers) as executor:
+        pending = deque()
+        for part in parts:
+            pending.append(executor.submit(evaluate, complete(part)))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class NpyColumns:
+    """Result columns as memory-mapped .npy files, written slice by slice."""
+
+    def __init__(self, path, n, append=False):
+        self.path = Path(path)
+        self.n = n
+        self.append = append
+        self.columns = {}
+
+    @staticmethod
+    def remove(path):
+        for name in COLUMNS:
+            (Path(path) / f"{name}.npy").unlink(missing_ok=True)
+
+    def write(self, start, results):
+        for name, values in results.items():
+            if name not in self.columns:
+                file = self.path / f"{name}.npy"
+                if self.append:
+                    self.columns[name] = open_memmap(file, mode="r+")
+                else:
+                    dtype = TEXT_DTYPE if name in TEXT_COLUMNS else values.dtype
+                    self.columns[name] = open_memmap(file, mode="w+", dtype=dtype, shape=(self.n,))
+            self.columns[name][start : start + len(values)] = values
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+
+
+class ParquetParts:
+    """Result chunks as Parquet files part-NNNNNN.parquet, one row group each."""
+
+    def __init__(self, path, n, append=False):
+        if pq is None:
+            raise ImportError("Parquet output needs pyarrow")
+        self.path = Path(path)
+
+    @staticmethod
+    def remove(path):
+        for part in Path(path).glob("part-*.parquet"):
+            part.unlink()
+
+    def write(self, start, results):
+        table = pa.table({name: np.asarray(values) for name, values in results.items()})
+        pq.write_table(table, self.path / f"part-{start:012d}.parquet")
+
+    def flush(self):
+        pass
+
+
+WRITERS = {"npy": NpyColumns, "parquet": ParquetParts}
+
+
+def _spec_key(axes, fixed, chunk_size, t_F_max, output):
+    spec = {
+        "axes": {name: np.asarray(axis).tolist() for name, axis in axes.items()},
+        "fixed": {name: np.asarray(value).tolist() for name, value in fixed.items()},
+        "chunk_size": chunk_size,
+        "t_F_max": t_F_max,
+        "output": output,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def stream_sweep(
+    axes,
+    path,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_workers=None,
+    t_F_max=None,
+    output="npy",
+    resume=True,
+    **fixed,
+):
+    """Evaluate the grid over `axes` chunk by chunk and write the results to `path`.
+
+    Nothing grid-sized is held in memory: rows are enumerated lazily,
+    evaluated in chunks of `chunk_size` (on `max_workers` processes) and
+    written to memory-mapped .npy columns (`output="npy"`, see
+    load_columns()) or to Parquet parts (`output="parquet"`, needs
+    pyarrow). After every chunk the checkpoint file in `path` records the
+    rows done; with `resume` an interrupted sweep of the same grid goes on
+    from there. A new sweep replaces the output of an earlier one in `path`
+    but does not start in a directory holding other files. Returns the
+    number of rows evaluated by this call.
+    """
+    unknown = (set(axes) | set(fixed)) - set(INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    n = grid_size(**axes)
+    key = _spec_key(axes, fixed, chunk_size, t_F_max, output)
+
+    checkpoint = path / CHECKPOINT
+    start = 0
+    if not checkpoint.exists() and any(path.iterdir()):
+        raise ValueError(f"{path} is not empty and holds no sweep; use an empty directory")
+    if resume and checkpoint.exists():
+        state = json.loads(checkpoint.read_text())
+        if state["key"] != key:
+            raise ValueError(f"{path} holds a different sweep; use another path or resume=False")
+        start = state["done"]
+    writer = WRITERS[output](path, n, append=start > 0)
+    if start == 0:  # a new sweep replaces the output of an earlier one
+        for writer_type in WRITERS.values():
+            writer_type.remove(path)
+
+    def save(done):
+        temporary = checkpoint.with_suffix(".tmp")
+        temporary.write_text(json.dumps({"key": key, "n": n, "done": done}))
+        os.replace(temporary, checkpoint)
+
+    # the checkpoint marks the directory as a sweep's before any output is written
+    save(start)
+    parts = grid_chunks(chunk_size, start, **axes)
+    done = start
+    for results in evaluate_chunks(parts, max_workers=max_workers, t_F_max=t_F_max, **fixed):
+        writer.write(done, results)
+        writer.flush()
+        done += len(results["q"])
+        save(done)
+    return done - start
+
+
+def load_columns(path):
+    """Columns written by stream_sweep(output="npy"), memory-mapped read-only."""
+    path = Path(path)
+    state = json.loads((path / CHECKPOINT).read_text())
+    return {
+        name: np.load(path / f"{name}.npy", mmap_mode="r")[: state["done"]]
+        for name in COLUMNS
+        if (path / f"{name}.npy").exists()
+    }
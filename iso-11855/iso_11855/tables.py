@@ -0,0 +1,89 @@
+"""Annex A tables of ISO 11855-2 in one binary data file.
+
+tables.npy holds every table array back to back as float64 and tables.json
+indexes it: the SHA-256 of the data and, per table, the offset and shape of
+each named array (axes first, values last, rows as printed in the standard).
+load_tables() memory-maps the data once and verifies the checksum.
+"""
+
+from functools import lru_cache
+import hashlib
+import json
+from math import prod
+from pathlib import Path
+import numpy as np
+
+TABLES_DATA = Path(__file__).with_name("tables.npy")
+TABLES_INDEX = Path(__file__).with_name("tables.json")
+# Incremented by reload_tables(); data baked from the tables is rebuilt when it changes
+GENERATION = 0
+_reload_hooks = []
+
+
+def checksum(values):
+    """SHA-256 of `values` as little-endian float64."""
+    return hashlib.sha256(np.ascontiguousarray(values, dtype="<f8").tobytes()).hexdigest()
+
+
+def write_tables(tables, data=TABLES_DATA, index=TABLES_INDEX):
+    """Store `tables`, {table: {array name: values}}, and their index."""
+    arrays, entries, offset = [], {}, 0
+    for table_name, named in tables.items():
+        entries[table_name] = {}
+        for name, values in named.items():
+            values = np.asarray(values, dtype="<f8")
+            entries[table_name][name] = {"offset": offset, "shape": list(values.shape)}
+            arrays.append(values.ravel())
+            offset += values.size
+    flat = np.concatenate(arrays)
+    np.save(data, flat)
+    index_data = {"sha256": checksum(flat), "tables": entries}
+    Path(index).write_text(json.dumps(index_data, indent=1) + "\n")
+    reload_tables()
+
+
+def on_reload(hook):
+    """Have reload_tables() call `hook()`; use as a decorator on the cache-clearing function."""
+    _reload_hooks.append(hook)
+    return hook
+
+
+def reload_tables():
+    """Drop everything built from the tables, so the next evaluation reads them again.
+
+    The modules building on the tables clear their caches through on_reload().
+    """
+    global GENERATION
+    load_tables.cache_clear()
+    data_checksum.cache_clear()
+    GENERATION += 1
+    for hook in _reload_hooks:
+        hook()
+
+
+@lru_cache(maxsize=None)
+def load_tables(data=TABLES_DATA, index=TABLES_INDEX):
+    """All tables as read-only views of the memory-mapped data file."""
+    meta = json.loads(Path(index).read_text())
+    flat = np.load(data, mmap_mode="r")
+    if checksum(flat) != meta["sha256"]:
+        raise ValueError(f"{data} does not match the checksum in {index}")
+    flat = flat.view(np.ndarray)
+    return {
+        table_name: {
+            name: flat[x["offset"] : x["offset"] + prod(x["shape"])].reshape(x["shape"])
+            for name, x in named.items()
+        }
+        for table_name, named in meta["tables"].items()
+    }
+
+
+def table(name):
+    """Named arrays of table `name`."""
+    return load_tables()[name]
+
+
+@lru_cache(maxsize=None)
+def data_checksum():
+    """SHA-256 of the table data in use, read once per reload_tables()."""
+    return json.loads(TABLES_INDEX.read_text())["sha256"]
@@ -0,0 +1,153 @@
+"""Monte Carlo propagation of input uncertainty in constant memory.
+
+Samples are drawn and evaluated chunk by chunk with the batch engine. Mean
+and variance are accumulated with Welford/Chan updates, percentiles from a
+fixed-size uniform reservoir, so memory does not grow with the number of
+samples.
+"""
+
+from dataclasses import dataclass
+import numpy as np
+
+from . import vectorized as v
+from .batch import INPUT_COLUMNS, PIPE_COLUMNS, EmbeddedRadiantSystemBatch
+from .limits import DEFAULT_T_F_MAX, limit_curves
+
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0)
+RESERVOIR_SIZE = 100_000  # Samples kept per output for the percentiles
+UNCERTAINTY_CHUNK_SIZE = 100_000
+OUTPUTS = ("q", "t_S_m", "margin")
+
+
+class RunningMoments:
+    """Count, mean and variance of a stream of arrays; NaN values are counted apart."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.n_invalid = 0
+
+    def update(self, values):
+        finite = np.isfinite(values)
+        self.n_invalid += int(values.size - finite.sum())
+        values = values[finite]
+        n_b = values.size
+        if not n_b:
+            return
+        mean_b = values.mean()
+        M2_b = ((values - mean_b) ** 2).sum()
+        # Chan et al. pairwise combination of the running and the chunk moments
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.M2 += M2_b + delta**2 * self.n * n_b / n
+        self.n = n
+
+    @property
+    def variance(self):
+        return self.M2 / (self.n - 1) if self.n > 1 else np.nan
+
+
+class Reservoir:
+    """Uniform random sample of fixed size from a stream of arrays (algorithm R)."""
+
+    def __init__(self, size=RESERVOIR_SIZE, rng=None):
+        self.values = np.empty(size)
+        self.seen = 0
+        self.rng = np.random.default_rng(rng)
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        size = self.values.size
+        free = max(0, min(size - self.seen, values.size))
+        self.values[self.seen : self.seen + free] = values[:free]
+        rest = values[free:]
+        if rest.size:
+            # item j (0-based) replaces a random slot with probability size / (j + 1)
+            j = self.seen + free + np.arange(rest.size)
+            slot = self.rng.integers(0, j + 1)
+            keep = slot < size
+            self.values[slot[keep]] = rest[keep]
+        self.seen += values.size
+
+    def percentile(self, q):
+        return np.percentile(self.values[: min(self.seen, self.values.size)], q)
+
+
+@dataclass
+class Uncertainty:
+    n: int  # Samples evaluated
+    mean: dict  # Mean of every output
+    std: dict  # Standard deviation of every output
+    percentiles: dict  # {output: {percentile: value}}
+    n_invalid: dict  # Samples without a result (NaN) per output
+    exceed_probability: float  # Share of the samples with a margin above the limit curve
+
+
+def _sample(distributions, base, n, rng):
+    columns = {name: np.broadcast_to(value, n) for name, value in base.items()}
+    for name, distribution in distributions.items():
+        if hasattr(distribution, "rvs"):
+            columns[name] = distribution.rvs(size=n, random_state=rng)
+        else:
+            columns[name] = np.broadcast_to(distribution, n)
+    return columns
+
+
+def propagate(
+    system,
+    distributions,
+    n=1_000_000,
+    percentiles=DEFAULT_PERCENTILES,
+    t_F_max=DEFAULT_T_F_MAX,
+    seed=None,
+    chunk_size=UNCERTAINTY_CHUNK_SIZE,
+    reservoir_size=RESERVOIR_SIZE,
+):
+    """Propagate input distributions through an EmbeddedRadiantSystem by Monte Carlo.
+
+    `distributions` maps input names (pipe inputs as in EmbeddedPipe) to
+    scipy.stats frozen distributions or fixed values; the other inputs keep
+    the values of `system`. Reports the heat flux q, the mean surface
+    temperature t_S_m from q by q1 to q4 (vectorized.t_S_m()) and the limit
+    curve margin q_G - q (negative where the floor gets too hot at t_F_max).
+    The exceed probability counts only the samples with a margin.
+    """
+    unknown = set(distributions) - set(INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+    base = {
+        name: getattr(system.embedded_pipe if name in PIPE_COLUMNS else system, name)
+        for name in INPUT_COLUMNS
+    }
+    rng = np.random.default_rng(seed)
+    moments = {output: RunningMoments() for output in OUTPUTS}
+    reservoirs = {output: Reservoir(reservoir_size, rng) for output in OUTPUTS}
+    exceeds = 0
+
+    for start in range(0, n, chunk_size):
+        columns = _sample(distributions, base, min(chunk_size, n - start), rng)
+        batch = EmbeddedRadiantSystemBatch.from_columns(columns)
+        limits = limit_curves(batch, t_F_max)
+        outputs = {
+            "q": batch.q,
+            "t_S_m": v.t_S_m(batch.q, batch.t_i, batch.case_of_application),
+            "margin": limits.q_G - batch.q,
+        }
+        for output, values in outputs.items():
+            moments[output].update(values)
+            reservoirs[output].update(values)
+        exceeds += int((limits.exceeds & np.isfinite(outputs["margin"])).sum())
+
+    return Uncertainty(
+        n=n,
+        mean={output: float(m.mean) for output, m in moments.items()},
+        std={output: float(np.sqrt(m.variance)) for output, m in moments.items()},
+        percentiles={
+            output: dict(zip(percentiles, reservoirs[output].percentile(percentiles).tolist()))
+            for output in OUTPUTS
+        },
+        n_invalid={output: m.n_invalid for output, m in moments.items()},
+        exceed_probability=exceeds / moments["margin"].n if moments["margin"].n else np.nan,
+    )
@@ -0,0 +1,269 @@
+"""Array versions of the formulas in functions.py.
+
+Every function accepts scalars or NumPy arrays, broadcasts its arguments and
+returns an ndarray. Piecewise formulas use masks instead of `if` branches, so
+one call evaluates any number of design points.
+"""
+
+from functools import reduce
+import numpy as np
+from scipy.special import lambertw
+
+from . import functions as f
+
+# Formulas of functions.py built only from arithmetic already broadcast.
+from .functions import (  # noqa: F401
+    q2,
+    q3,
+    q4,
+    q_des,
+    m_W,
+    m_U,
+    m_D,
+    a_B1,
+    q7,
+    q8,
+    a_U2,
+    K_WL,
+    a_WL1,
+    a_B3,
+    q_G1,
+    fi,
+    q_G2,
+    q_G3,
+    k_E_prim,
+    q_U1,
+    R_o,
+    R_u,
+    q_U2,
+    K_H2,
+    deltaR_h,
+    R_t1,
+    q11,
+    q12,
+    K_H3,
+    R_w1,
+    U_i,
+    R_i,
+    R_w2,
+    R_x2,
+    U_1,
+    U_2,
+)
+
+
+def q1(t_S_m, t_i):
+    return 8.92 * np.power(np.subtract(t_S_m, t_i), 1.1)
+
+
+def power_product(a_i, m_i):
+    return reduce(np.multiply, [np.power(a, m) for a, m in zip(a_i, m_i)], np.float64(1.0))
+
+
+def q5(B, a_i, m_i, deltat_H):
+    return B * power_product(a_i, m_i) * deltat_H
+
+
+def deltat_H(t_V, t_R, t_i):
+    t_V, t_R, t_i = np.asarray(t_V), np.asarray(t_R), np.asarray(t_i)
+    return (t_V - t_R) / np.log((t_V - t_i) / (t_R - t_i))
+
+
+def t_V(deltat_H, t_i, sigma):
+    deltat_H, sigma = np.asarray(deltat_H, dtype=float), np.asarray(sigma, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = -sigma / np.expm1(-sigma / deltat_H)
+    return t_i + np.where(sigma == 0, deltat_H, x)
+
+
+def sigma(deltat_H, t_V, t_i):
+    """Spread t_V - t_R giving deltat_H at supply temperature t_V; NaN if deltat_H >= t_V - t_i.
+
+    deltat_H * log(a / (a - sigma)) = sigma with a = t_V - t_i is solved for
+    u = a - sigma by the principal branch of the Lambert W function.
+    """
+    deltat_H, a = np.asarray(deltat_H, dtype=float), np.asarray(t_V - t_i, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        r = a / deltat_H
+        u = -deltat_H * lambertw(-r * np.exp(-r)).real
+        return np.where((deltat_H > 0) & (r > 1), a - u, np.nan)
+
+
+def q6(a_B, a_W, a_U, a_D, m_W, m_U, m_D, deltat_H, B=6.7):
+    a_i = [a_B, a_W, a_U, a_D]
+    m_i = [1, m_W, m_U, m_D]
+    return q5(B, a_i, m_i, deltat_H)
+
+
+def K_H1(a_i, m_i, s_u, s_u_star, lambda_E):
+    return 1 / (1 / power_product(a_i, m_i) + (s_u - s_u_star) / lambda_E)
+
+
+def q9(a_B, a_W, a_U, a_WL, a_K, m_W, deltat_H, B=6.5):
+    a_i = [a_B, a_W, a_U, a_WL, a_K]
+    m_i = [1, m_W, 1, 1, 1]
+    return q5(B, a_i, m_i, deltat_H)
+
+
+def a_B2(a_U, a_W, m_W, a_WL, a_K, R_k_B, W, B=6.5):
+    return 1 / (
+        1 + B * a_U * np.power(a_W, m_W) * a_WL * a_K * R_k_B * (1 + 0.44 * np.sqrt(W))
+    )
+
+
+def q10(a_B, a_U, deltat_H, B=6.5):
+    a_i = [a_B, 1.06, a_U]
+    m_i = [1, 1, 1]
+    return q5(B, a_i, m_i, deltat_H)
+
+
+def deltat_H_G(fi, B_G, B, a_i, m_i, n_G):
+    return fi * np.power(B_G / (B * power_product(a_i, m_i)), 1 / (1 - np.asarray(n_G)))
+
+
+def f_G(s_u, W, q_G_max, q_G_0375):
+    x = np.divide(s_u, W)
+    q = q_G_0375 * 0.375 / np.asarray(W)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_G = (q_G_max - (q_G_max - q) * np.exp(-20 * (x - 0.173) ** 2)) / q
+    return np.where(x > 0.173, f_G, 1.0)
+
+
+def B1(B_0, a_i, m_i, W, k_R, d_a, s_R):
+    k_R_0 = 0.35
+    s_R_0 = 0.002
+    x = 1 / B_0 + 1.1 / np.pi * power_product(a_i, m_i) * W * (
+        1 / (2 * k_R) * np.log(d_a / (d_a - 2 * s_R))
+        - 1 / (2 * k_R_0) * np.log(d_a / (d_a - 2 * s_R_0))
+    )
+    return 1 / x
+
+
+def B2(B_0, a_i, m_i, W, k_R, d_a, s_R, k_M, d_M):
+    k_R_0 = 0.35
+    s_R_0 = 0.002
+    x = 1 / B_0 + 1.1 / np.pi * power_product(a_i, m_i) * W * (
+        1 / (2 * k_M) * np.log(d_M / d_a)
+        + 1 / (2 * k_R) * np.log(d_a / (d_a - 2 * s_R))
+        - 1 / (2 * k_R_0) * np.log(d_M / (d_M - 2 * s_R_0))
+    )
+    return 1 / x
+
+
+def a_W1(R_k_B):
+    return f.curve("a_W1")(np.asarray(R_k_B, dtype=float))
+
+
+def _ev(name, x, y):
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    return f.interpolator(name).ev(x.ravel(), y.ravel()).reshape(x.shape)
+
+
+def a_U1(R_k_B, W):
+    return _ev("a_U1", R_k_B, W)
+
+
+def a_D(R_k_B, W):
+    return _ev("a_D", R_k_B, W)
+
+
+def B_G1(s_u, k_E, W):
+    return _ev("B_G1", np.divide(s_u, k_E), W)
+
+
+def B_G2(s_u, W):
+    x = np.divide(s_u, W)
+    return np.where(x <= 0.7, f.curve("B_G2")(x), 100.0)
+
+
+def n_G1(s_u, k_E, W):
+    return _ev("n_G1", np.divide(s_u, k_E), W)
+
+
+def n_G2(s_u, W):
+    x = np.divide(s_u, W)
+    return np.where(x <= 0.7, f.curve("n_G2")(x), 0.0)
+
+
+def a_W2(s_u, k_E):
+    return f.curve("a_W2")(np.divide(s_u, k_E))
+
+
+def b_u(W):
+    W = np.asarray(W, dtype=float)
+    return np.where(W <= 0.1, 1.0, np.where(W < 0.45, f.curve("b_u")(W), 0.0))
+
+
+def a_WL2(K_WL, W, D, method=None):
+    K_WL, W, D = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (K_WL, W, D)))
+    a_WL = f.interpolator("a_WL2", method=method or f.A_WL2_METHOD)
+    return a_WL(np.stack([K_WL, W, D], axis=-1))
+
+
+def a_WL_inf(W):
+    return f.curve("a_WL_inf")(np.asarray(W, dtype=float))
+
+
+def a_WL3(K_WL, W, D, a_WL_KL_0=None):
+    K_WL = np.asarray(K_WL, dtype=float)
+    a_WL_KL_inf = a_WL_inf(W)
+    if a_WL_KL_0 is None:
+        a_WL_KL_0 = a_WL2(K_WL=0, W=W, D=D)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_WL_high = a_WL_KL_inf - (a_WL_KL_inf - a_WL_KL_0) * np.power(
+            (a_WL_KL_inf - 1) / (a_WL_KL_inf - a_WL_KL_0), K_WL
+        )
+    # 0.5 <= K_WL <= 1
+    a_WL_low = _ev("a_WL3", K_WL, W)
+    return np.where(K_WL > 1, a_WL_high, a_WL_low)
+
+
+def a_K(W):
+    return f.curve("a_K")(np.asarray(W, dtype=float))
+
+
+def B_G3(K_WL, W):
+    return _ev("B_G3", W, K_WL)
+
+
+def n_G3(K_WL, W):
+    return _ev("n_G3", W, K_WL)
+
+
+def alfa(case_of_application="floor heating"):
+    cases = np.char.lower(np.asarray(case_of_application, dtype=str))
+    result = np.full(cases.shape, np.nan)
+    for case in np.unique(cases):
+        value = f.alfa(str(case))
+        if value is not None:
+            result[cases == case] = value
+    return result
+
+
+def t_S_m(q, t_i, case_of_application="floor heating"):
+    """Mean surface temperature giving the heat flux q (negative for cooling), q1 to q4 inverted."""
+    cases = np.char.lower(np.asarray(case_of_application, dtype=str))
+    q, t_i, cases = np.broadcast_arrays(np.asarray(q, dtype=float), np.asarray(t_i), cases)
+    c, n = np.full(q.shape, np.nan), np.ones(q.shape)
+    for case in np.unique(cases):
+        if case in f.SURFACE_FLUX:
+            c[cases == case], n[cases == case] = f.SURFACE_FLUX[str(case)]
+    return t_i + np.sign(q) * (np.abs(q) / c) ** (1 / n)
+
+
+def R_t2(R_w, R_r, R_x, U_1, U_2, m_H_sp, c):
+    U = 1 / (U_1 + U_2)
+    mc = m_H_sp * c
+    return 1 / mc * (1 - np.exp(-1 / ((R_w + R_r + R_x + U) * mc))) - U
+
+
+def R_r1(W, d_a, s_r, k_r):
+    return W * np.log(d_a / (d_a - 2 * s_r)) / (2 * np.pi * k_r)
+
+
+def R_x1(W, d_a, k_b):
+    return W * np.log(W / (np.pi * d_a)) / (2 * np.pi * k_b)
+
+
+def R_r2(W, d_a, s_r, k_r):
+    return W * np.log(d_a / (d_a - 2 * s_r)) / (2 * np.pi * k_r)